@@ -0,0 +1,183 @@
+# Importing necessary libraries
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2  # OpenCV for image processing
+import numpy as np
+
+import editor_trace  # Per-operation timings recorded by the editor
+
+# ----------------------------
+# Settings
+# ----------------------------
+SIZES_MP = (1, 24, 100)  # Synthetic image sizes in megapixels
+BAND_ROWS = 1024  # Rows generated at once so building a 100 MP image stays cheap
+SETTLE_TIMEOUT = 300  # Seconds to wait for a load/save/render before giving up
+
+
+# ----------------------------
+# Synthetic Images
+# ----------------------------
+def synthetic_image(megapixels, path):
+    """Write a 3:2 JPEG of about megapixels with gradients, edges and noise, like a photo compresses"""
+    w = int((megapixels * 1e6 * 1.5) ** 0.5)
+    h = int(w / 1.5)
+    img = np.empty((h, w, 3), np.uint8)
+    x = np.arange(w, dtype=np.float32)[None, :]
+    rng = np.random.default_rng(megapixels)
+    for y0 in range(0, h, BAND_ROWS):
+        y = np.arange(y0, min(y0 + BAND_ROWS, h), dtype=np.float32)[:, None]
+        noise = rng.integers(0, 24, (y.shape[0], w), dtype=np.uint8)
+        img[y0:y0 + y.shape[0], :, 0] = (x * 255 / w + noise).astype(np.uint8)
+        img[y0:y0 + y.shape[0], :, 1] = (y * 255 / h + noise).astype(np.uint8)
+        img[y0:y0 + y.shape[0], :, 2] = ((x // 256 + y // 256) % 2 * 160 + noise).astype(np.uint8)
+    if not cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 90]):
+        raise IOError(f"Could not write {path}")
+    return path, (w, h)
+
+
+# ----------------------------
+# Scripted Editing Session
+# ----------------------------
+def event(x, y, **fields):
+    """Stand-in for a Tk event; the handlers only read these attributes"""
+    return types.SimpleNamespace(x=x, y=y, num=fields.get("num", 0), delta=fields.get("delta", 0))
+
+
+def run_session(image_path, out_dir, rounds, trace_path=None):
+    """Drive a hidden editor window through loads, crops, resizes, undo/redo, zoom/pan and saves"""
+    import tkinter as tk
+    import first_question
+
+    root = tk.Tk()
+    root.withdraw()  # Nothing is shown; Tk still needs a display (use xvfb-run on servers)
+    app = first_question.ImageEditorApp(root)
+    app.finish_save = lambda file_path: None  # No "Saved" popups to click away
+
+    def io_failed(error):
+        raise error
+    app.io_failed = io_failed
+
+    def settle(done):
+        """Run the Tk event loop until done() is true"""
+        deadline = time.perf_counter() + SETTLE_TIMEOUT
+        while not done():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("Editor did not settle")
+            root.update()
+            time.sleep(0.001)
+
+    idle = lambda: (not app.io_worker.busy() and not app.preview_worker.busy()
+                    and app.refine_after_id is None and app.view_after_id is None and app.drag_after_id is None)
+    try:
+        for r in range(rounds):
+            # Load: drop the cached decode so every round pays for a real one
+            app.image_cache.discard(image_path)
+            app.open_path(image_path)
+            settle(lambda: app.pending_load is None and app.image is not None)
+
+            # Crop: press, drag through a few frames, release
+            x0, y0 = 80 + 10 * r, 60 + 10 * r
+            app.on_mouse_down(event(x0, y0))
+            for i in range(1, 21):
+                app.on_mouse_drag(event(x0 + 18 * i, y0 + 14 * i))
+                root.update()
+                time.sleep(0.005)
+            app.on_mouse_up(event(x0 + 360, y0 + 280))
+            settle(idle)
+
+            # Resize: sweep the slider, then let the high quality preview finish
+            for value in range(100, 30, -5):
+                app.resize_slider.set(value)
+                root.update()
+            settle(idle)
+
+            # Undo/redo through the history
+            for _ in range(3):
+                app.undo_action()
+                root.update()
+            for _ in range(3):
+                app.redo_action()
+                root.update()
+            settle(idle)
+
+            # Zoom in around a point, pan, zoom back out
+            for i in range(8):
+                app.on_zoom(event(300, 300, num=4))
+                settle(lambda: app.view_after_id is None)
+            app.on_pan_start(event(300, 300))
+            for i in range(1, 11):
+                app.on_pan_drag(event(300 - 20 * i, 300 - 15 * i))
+                settle(lambda: app.view_after_id is None)
+            app.fit_view()
+            settle(idle)
+
+            # Save the edit in the background
+            app.save_to(os.path.join(out_dir, f"edit_{r}.jpg"))
+            settle(idle)
+    finally:
+        if trace_path:
+            editor_trace.tracer.export(trace_path)
+        root.destroy()
+    return {
+        "operations": editor_trace.tracer.summary(),
+        "latency": app.latency_stats(),
+        "peak_rss_mb": editor_trace.peak_rss_bytes() / (1024 * 1024),
+    }
+
+
+# ----------------------------
+# Benchmark Runner
+# ----------------------------
+def in_fresh_process(fn, *args):
+    """Run fn in a new process so each size gets its own peak RSS and a cold start"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def print_report(megapixels, size, result):
+    print(f"\n== {megapixels} MP ({size[0]}x{size[1]}), peak RSS {result['peak_rss_mb']:.0f} MB")
+    print(f"{'operation':36} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'RSS +MB':>8}")
+    for name, stats in sorted(result["operations"].items()):
+        print(f"{name:36} {stats['count']:5d} {stats['p50']:9.2f} {stats['p95']:9.2f} "
+              f"{stats['p99']:9.2f} {stats['max']:9.2f} {stats['rss_mb']:8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the image editor headlessly on synthetic images")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES_MP)), help="Comma separated megapixel sizes")
+    parser.add_argument("--rounds", type=int, default=3, help="Scripted sessions per image")
+    parser.add_argument("--workdir", default=None, help="Where to write test images and saves (default: temp dir)")
+    parser.add_argument("--json", default=None, help="Also write all results to this JSON file")
+    parser.add_argument("--trace-dir", default=None, help="Write a Chrome trace per size into this folder")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="editor_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    if args.trace_dir:
+        os.makedirs(args.trace_dir, exist_ok=True)
+    results = {}
+    for megapixels in (int(size) for size in args.sizes.split(",")):
+        path = os.path.join(workdir, f"synthetic_{megapixels}mp.jpg")
+        path, size = in_fresh_process(synthetic_image, megapixels, path)
+        trace_path = os.path.join(args.trace_dir, f"trace_{megapixels}mp.json") if args.trace_dir else None
+        result = in_fresh_process(run_session, path, workdir, args.rounds, trace_path)
+        result["size"] = size
+        results[megapixels] = result
+        print_report(megapixels, size, result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+# Run from the command line
+if __name__ == "__main__":
+    sys.exit(main())
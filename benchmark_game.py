@@ -0,0 +1,187 @@
+# Importing necessary libraries
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # No window needed; must be set before pygame starts
+
+import second_question as game
+from game_input import Controls, InputRecording, ReplayMismatch
+from game_render import StaticChunks
+
+# ----------------------------
+# Settings
+# ----------------------------
+SEED = 2024  # Every scenario is recorded from this seed, so runs compare like with like
+TOLERANCE = 0.25  # A phase's p95 may grow this much over the baseline before the check fails
+MIN_REGRESSION_MS = 0.05  # Smaller growth is timer noise, whatever the ratio
+STARTUP_RUNS = 5  # Fresh interpreters started to time importing the game and drawing its first frame
+PHASES = ("update", "draw", "import", "first_frame")
+
+# Run in a new interpreter: time the import, then everything up to the first frame on screen
+STARTUP_CODE = """
+import json, time
+start = time.perf_counter()
+import pygame, second_question as game
+imported = time.perf_counter()
+sim = game.GameSim(0)
+chunks = game.StaticChunks(sim.platforms, game.WIDTH, game.HEIGHT, game.SKY)
+game.draw_game(game.app.screen, sim, chunks)
+pygame.display.flip()
+shown = time.perf_counter()
+print(json.dumps([(imported - start) * 1000, (shown - start) * 1000]))
+"""
+
+
+# ----------------------------
+# Scripted Players
+# ----------------------------
+def hold_and_fire(sim):
+    # Stand in the crowd firing every step, turning around every two seconds and hopping now and then
+    turn = sim.tick % 120 == 0
+    facing_left = sim.tick // 120 % 2 == 1
+    return Controls(turn and facing_left, turn and not facing_left, sim.tick % 40 == 0, True)
+
+
+def run_right(sim):
+    # Keep running right, jumping and firing regularly
+    return Controls(False, True, sim.tick % 30 == 0, sim.tick % 6 == 0)
+
+
+# name -> (setup, endless, seconds, policy)
+SCENARIOS = {
+    "dense_combat": ("swarm", False, 20, hold_and_fire),
+    "boss_level": ("boss", False, 30, game.autopilot),
+    "long_traversal": ("", True, 120, run_right),
+}
+
+
+# ----------------------------
+# Timed Replay
+# ----------------------------
+def percentiles(samples):
+    """p50/p95/p99/max of a list of numbers"""
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+def timed_replay(recording):
+    """Replay a recording, drawing every step, and time the update and the draw of each one"""
+    sim = game.replay_sim(recording)
+    level_chunks = None
+    update_ms, draw_ms = [], []
+    for controls in recording:
+        t0 = time.perf_counter()
+        game.replay_step(sim, controls)
+        t1 = time.perf_counter()
+        if level_chunks is None or level_chunks.sprites is not sim.platforms:
+            level_chunks = StaticChunks(sim.platforms, game.WIDTH, game.HEIGHT, game.SKY)
+            sim.streamer.on_change = level_chunks.invalidate
+        t2 = time.perf_counter()
+        game.draw_game(game.app.screen, sim, level_chunks)
+        t3 = time.perf_counter()
+        update_ms.append((t1 - t0) * 1000)
+        draw_ms.append((t3 - t2) * 1000)
+    game.check_replay(sim, recording)
+    return {
+        "steps": len(recording),
+        "update": percentiles(update_ms),
+        "draw": percentiles(draw_ms),
+        "enemies_left": len(sim.enemies),
+    }
+
+
+def startup_times(runs=STARTUP_RUNS):
+    """Import time and cold start to first frame (ms), each in a new interpreter with a dummy display"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy")
+    imports, first_frames = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", STARTUP_CODE], cwd=here, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        import_ms, first_frame_ms = json.loads(out.strip().splitlines()[-1])
+        imports.append(import_ms)
+        first_frames.append(first_frame_ms)
+    return {"steps": runs, "import": percentiles(imports), "first_frame": percentiles(first_frames)}
+
+
+def regressions(results, baseline, tolerance=TOLERANCE):
+    """Descriptions of every scenario phase whose p95 got slower than the baseline allows"""
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for phase in PHASES:
+            if phase not in result or phase not in before:
+                continue
+            old, new = before[phase]["p95"], result[phase]["p95"]
+            if new > old * (1 + tolerance) and new - old > MIN_REGRESSION_MS:
+                found.append(f"{name} {phase} p95 {old:.3f} ms -> {new:.3f} ms")
+    return found
+
+
+def print_report(name, result):
+    if "enemies_left" in result:
+        print(f"\n== {name}: {result['steps']} steps, {result['enemies_left']} enemies left")
+    else:
+        print(f"\n== {name}: {result['steps']} runs")
+    print(f"{'phase':12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for phase in PHASES:
+        if phase in result:
+            stats = result[phase]
+            print(f"{phase:12} {stats['p50']:9.3f} {stats['p95']:9.3f} {stats['p99']:9.3f} {stats['max']:9.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay standard game scenarios headlessly and time each step")
+    parser.add_argument("replays", nargs="*", help="Recorded games (--record) to time as extra scenarios")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated scenario names")
+    parser.add_argument("--save-replays", default=None, help="Also write each scenario's recording into this folder")
+    parser.add_argument("--json", default=None, help="Also write all results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Results JSON of an earlier run; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed p95 growth over the baseline")
+    parser.add_argument("--no-startup", action="store_true", help="Skip timing import and first frame")
+    args = parser.parse_args(argv)
+
+    results = {}
+    if not args.no_startup:
+        results["startup"] = startup_times()
+        print_report("startup", results["startup"])
+    recordings = {}
+    for name in filter(None, args.scenarios.split(",")):
+        setup, endless, seconds, policy = SCENARIOS[name]
+        recordings[name] = game.record(seconds, policy, SEED, endless, setup)
+        if args.save_replays:
+            os.makedirs(args.save_replays, exist_ok=True)
+            recordings[name].save(os.path.join(args.save_replays, f"{name}.replay"))
+    for path in args.replays:
+        recordings[os.path.basename(path)] = InputRecording.load(path)
+
+    for name, recording in recordings.items():
+        try:
+            results[name] = timed_replay(recording)
+        except ReplayMismatch as e:
+            print(f"{name}: replay is not deterministic: {e}")
+            return 1
+        print_report(name, results[name])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION: {line}")
+        if found:
+            return 1
+    return 0
+
+
+# Run from the command line
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# Importing necessary libraries
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+
+# ----------------------------
+# Memory Readings
+# ----------------------------
+def rss_bytes():
+    """Current resident set size of this process, or 0 where it cannot be read cheaply"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def peak_rss_bytes():
+    """Highest resident set size this process has reached"""
+    if resource is None:
+        return rss_bytes()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kB
+
+
+def percentiles(samples):
+    """p50/p95/p99/max of a list of numbers"""
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+# ----------------------------
+# Tracer
+# ----------------------------
+class Tracer:
+    """Records how long named operations take and how much they change RSS, from any thread"""
+
+    def __init__(self, enabled=True, max_events=200000):
+        self.enabled = enabled
+        self.events = deque(maxlen=max_events)  # (name, start s, duration s, rss delta bytes, thread id, args)
+        self.thread_names = {}  # thread id -> name, for the trace viewer
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, **args):
+        """Time the body of a with block as one operation"""
+        if not self.enabled:
+            yield
+            return
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.record(name, start, duration, rss_bytes() - rss_before, args)
+
+    def record(self, name, start, duration, rss_delta=0, args=None):
+        thread = threading.current_thread()
+        with self.lock:
+            self.thread_names.setdefault(thread.ident, thread.name)
+            self.events.append((name, start, duration, rss_delta, thread.ident, args or {}))
+
+    def traced(self, name=None):
+        """Decorator form of span(); the name defaults to the function's qualified name"""
+        def decorate(fn):
+            label = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(label):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def clear(self):
+        with self.lock:
+            self.events.clear()
+
+    def durations(self, name):
+        """Recorded durations of one operation in ms, oldest first"""
+        with self.lock:
+            return [event[2] * 1000 for event in self.events if event[0] == name]
+
+    def summary(self):
+        """Per operation: count, latency percentiles (ms) and the largest RSS growth (MB)"""
+        grouped = {}
+        with self.lock:
+            for name, _, duration, rss_delta, _, _ in self.events:
+                grouped.setdefault(name, []).append((duration * 1000, rss_delta))
+        stats = {}
+        for name, samples in grouped.items():
+            stats[name] = dict(percentiles([ms for ms, _ in samples]), count=len(samples))
+            stats[name]["rss_mb"] = max(delta for _, delta in samples) / (1024 * 1024)
+        return stats
+
+    def chrome_trace(self):
+        """Events in the Chrome trace event format (chrome://tracing, Perfetto, speedscope)"""
+        pid = os.getpid()
+        with self.lock:
+            events = list(self.events)
+            names = dict(self.thread_names)
+        trace = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+            for tid, thread_name in names.items()
+        ]
+        for name, start, duration, rss_delta, tid, args in events:
+            trace.append({
+                "name": name, "ph": "X", "pid": pid, "tid": tid,
+                "ts": (start - self.origin) * 1e6, "dur": duration * 1e6,
+                "args": dict(args, rss_delta_kb=rss_delta // 1024),
+            })
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        """Write the Chrome trace JSON to path"""
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+# Shared by the editor, its workers and the benchmarks; EDITOR_TRACE=0 turns recording off
+tracer = Tracer(enabled=os.environ.get("EDITOR_TRACE", "1") != "0")
+traced = tracer.traced
@@ -0,0 +1,161 @@
+# Importing necessary libraries
+import queue
+import threading
+
+
+# ----------------------------
+# Latest-Only Background Worker
+# ----------------------------
+class LatestOnlyWorker:
+    """Background thread that runs only the most recently submitted job; older requests are dropped"""
+
+    def __init__(self, name="render-worker"):
+        self.cond = threading.Condition()
+        self.pending = None  # (generation, fn, args) waiting to run
+        self.generation = 0  # Bumped on every submit/cancel; results from older generations are stale
+        self.running = False
+        self.results = queue.Queue()  # Finished (generation, result, error), read by the Tk thread
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args):
+        """Queue fn(*args), replacing any job that has not started yet"""
+        with self.cond:
+            self.generation += 1
+            self.pending = (self.generation, fn, args)
+            self.cond.notify()
+            return self.generation
+
+    def cancel(self):
+        """Forget the waiting job and ignore the result of the running one"""
+        with self.cond:
+            self.generation += 1
+            self.pending = None
+
+    def busy(self):
+        """True while a job is waiting, running, or has a result not yet polled"""
+        with self.cond:
+            return self.pending is not None or self.running or not self.results.empty()
+
+    def poll(self):
+        """Return the newest up-to-date result, or None; call from the Tk thread"""
+        latest = None
+        while True:
+            try:
+                generation, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.generation:
+                if error is not None:
+                    raise error
+                latest = result
+        return latest
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.pending is None:
+                    self.cond.wait()
+                generation, fn, args = self.pending
+                self.pending = None
+                self.running = True
+            try:
+                result, error = fn(*args), None
+            except Exception as e:
+                result, error = None, e
+            with self.cond:
+                self.running = False
+                self.results.put((generation, result, error))
+
+
+# ----------------------------
+# Queued Load/Save Worker
+# ----------------------------
+class Cancelled(Exception):
+    """Raised inside a job once it has been cancelled"""
+
+
+class IOJob:
+    """One queued load or save; the worker updates progress, the Tk thread may cancel it"""
+
+    def __init__(self, label, fn, args, on_done=None, on_error=None, on_partial=None, results=None):
+        self.label = label  # Text shown in the status bar
+        self.fn = fn  # Called as fn(job, *args) on the worker thread
+        self.args = args
+        self.on_done = on_done  # Called with the result on the Tk thread
+        self.on_error = on_error  # Called with the exception on the Tk thread
+        self.on_partial = on_partial  # Called on the Tk thread with each value passed to publish()
+        self.results = results  # The worker's result queue
+        self.progress = 0.0  # 0.0 .. 1.0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, fraction):
+        """Record progress and stop the job here if it was cancelled"""
+        self.progress = fraction
+        if self.cancelled:
+            raise Cancelled()
+
+    def publish(self, value):
+        """Hand an intermediate result (e.g. a quick low resolution decode) to the Tk thread"""
+        if self.on_partial is not None and not self.cancelled:
+            self.results.put((self, value, None, False))
+
+
+class IOWorker:
+    """Background thread that runs queued decode/encode jobs one at a time, in order"""
+
+    def __init__(self, name="io-worker"):
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()  # (job, result, error, finished), read by the Tk thread
+        self.pending = []  # Jobs submitted and not yet delivered, oldest first
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, label, fn, *args, on_done=None, on_error=None, on_partial=None):
+        """Queue fn(job, *args) and return its IOJob"""
+        job = IOJob(label, fn, args, on_done, on_error, on_partial, self.results)
+        self.pending.append(job)
+        self.jobs.put(job)
+        return job
+
+    def cancel_all(self):
+        for job in self.pending:
+            job.cancel()
+
+    def busy(self):
+        return bool(self.pending)
+
+    def poll(self):
+        """Deliver finished jobs to their callbacks; call from the Tk thread"""
+        while True:
+            try:
+                job, result, error, finished = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if not finished:
+                if not job.cancelled:
+                    job.on_partial(result)
+                continue
+            self.pending.remove(job)
+            if job.cancelled or isinstance(error, Cancelled):
+                continue  # Also when cancelled after finishing, while the result waited to be polled
+            if error is not None:
+                if job.on_error is not None:
+                    job.on_error(error)
+            elif job.on_done is not None:
+                job.on_done(result)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job.cancelled:
+                    raise Cancelled()
+                result, error = job.fn(job, *job.args), None
+                job.progress = 1.0
+            except Exception as e:
+                result, error = None, e
+            self.results.put((job, result, error, True))
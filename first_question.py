@@ -4,8 +4,151 @@ from tkinter import filedialog, messagebox  # For file dialogs and message popup
 from tkinter import ttk  # For styled widgets like sliders
 from PIL import Image, ImageTk  # For handling images with Python Imaging Library
 import cv2  # OpenCV for image processing
-import numpy as np
 import os
+import time
+from collections import OrderedDict, deque, namedtuple
+import editor_trace  # Per-operation timings, exportable as a Chrome trace
+import editor_workers  # Background threads for rendering
+import image_session  # Folder sessions and the decoded image cache
+import image_engine  # GUI-free crop/scale transforms shared with the batch CLI
+import tiled_image  # Memory-mapped backend for images too large to decode into RAM
+
+# Preview rendering settings
+FRAME_MS = 1000 / 60  # Budget for slider-to-paint latency
+SETTLE_MS = 120  # Slider must rest this long before the high quality preview is rendered
+POLL_MS = 8  # How often the Tk thread checks for finished background renders
+IO_POLL_MS = 50  # How often the Tk thread checks load/save progress
+
+# One editor state: a crop box (x0, y0, x1, y1) into the source image and a resize scale
+EditState = namedtuple("EditState", ["crop_box", "scale"])
+
+
+# Undo/redo history that stores edit operations instead of pixels
+class EditHistory:
+    ENTRY_BYTES = 64  # Approximate cost of one operation record
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes  # Memory budget for operations plus cached snapshots
+        self.undo_stack = []
+        self.redo_stack = []
+        self.snapshots = OrderedDict()  # EditState -> cached preview pixels, oldest first
+        self.snapshot_bytes = 0
+
+    def used_bytes(self):
+        """Return the number of bytes currently charged against the budget"""
+        return (len(self.undo_stack) + len(self.redo_stack)) * self.ENTRY_BYTES + self.snapshot_bytes
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def push(self, state, snapshot=None):
+        """Record a state before a new edit replaces it; clears the redo stack"""
+        self.undo_stack.append(state)
+        self.redo_stack.clear()
+        self.cache_snapshot(state, snapshot)
+        self.enforce_budget()
+
+    def undo(self, current, snapshot=None):
+        """Step back one edit, remembering the current state for redo"""
+        if not self.undo_stack:
+            return None
+        self.redo_stack.append(current)
+        self.cache_snapshot(current, snapshot)
+        state = self.undo_stack.pop()
+        self.enforce_budget()
+        return state
+
+    def redo(self, current, snapshot=None):
+        """Re-apply the most recently undone edit"""
+        if not self.redo_stack:
+            return None
+        self.undo_stack.append(current)
+        self.cache_snapshot(current, snapshot)
+        state = self.redo_stack.pop()
+        self.enforce_budget()
+        return state
+
+    def cache_snapshot(self, state, pixels):
+        """Keep already rendered pixels for a state so restoring it needs no work"""
+        if pixels is None or pixels.nbytes > self.max_bytes:
+            return
+        old = self.snapshots.pop(state, None)
+        if old is not None:
+            self.snapshot_bytes -= old.nbytes
+        self.snapshots[state] = pixels
+        self.snapshot_bytes += pixels.nbytes
+
+    def get_snapshot(self, state):
+        """Return cached pixels for a state (or None) and mark them recently used"""
+        pixels = self.snapshots.get(state)
+        if pixels is not None:
+            self.snapshots.move_to_end(state)
+        return pixels
+
+    def enforce_budget(self):
+        """Evict least recently used snapshots, then the oldest operations, until under budget"""
+        while self.used_bytes() > self.max_bytes and self.snapshots:
+            _, pixels = self.snapshots.popitem(last=False)
+            self.snapshot_bytes -= pixels.nbytes
+        while self.used_bytes() > self.max_bytes and self.undo_stack:
+            self.undo_stack.pop(0)
+
+    def drop_snapshots(self):
+        """Free every cached preview, keeping the operations; restoring a state renders it again"""
+        self.snapshots.clear()
+        self.snapshot_bytes = 0
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.drop_snapshots()
+
+# ----------------------------
+# Background load/save jobs (run on the I/O worker thread, never touch Tk)
+# ----------------------------
+@editor_trace.traced()
+def load_image_job(job, file_path):
+    """Open or decode an image and pre-build the pyramid levels the canvas needs"""
+    # Paint a quick reduced-size decode first (unless nothing shows it, e.g. a prefetch), then
+    # decode at full resolution
+    if job.on_partial is not None:
+        reduced = image_engine.load_rgb_reduced(file_path)
+        if reduced is not None:
+            job.publish((file_path, reduced))
+    job.report(0.05)
+    # Large files are memory-mapped and read in tiles; small ones are decoded as before
+    image = tiled_image.open_image(file_path)
+    job.report(0.3)
+    if image is None:
+        image = image_engine.load_rgb(file_path)
+    job.report(0.7)
+    source = image.overview(image_engine.CANVAS_SIZE) if isinstance(image, tiled_image.TiledImage) else image
+    pyramid = image_engine.ImagePyramid(source)
+    h, w = image.shape[:2]
+    pyramid.level_for(*image_engine.fit_size(w, h, image_engine.CANVAS_SIZE, image_engine.CANVAS_SIZE))
+    job.report(0.95)
+    return file_path, image, pyramid
+
+
+@editor_trace.traced()
+def save_image_job(job, file_path, image, pipeline):
+    """Render the edit pipeline from the source, encode and write it, reporting progress as it goes"""
+    job.report(0.05)
+    # Same single-resample pipeline as the batch CLI, so both produce identical files
+    img_to_save = pipeline.render(image)
+    job.report(0.4)
+    image_engine.save_rgb(file_path, img_to_save, progress=lambda f: job.report(0.4 + 0.6 * f))
+    if isinstance(image, tiled_image.TiledImage):
+        image.release()
+    return file_path
+
+
+# High quality previews are timed on the worker thread that renders them
+render_refined = editor_trace.traced("render_refined")(image_engine.render_fitted)
+
 
 # Main Image Editor class
 class ImageEditorApp:
@@ -17,17 +160,64 @@ class ImageEditorApp:
         # Initializing variables to store image data and GUI elements
         self.image = None  # Original loaded image
         self.cropped_image = None  # Cropped image after user selection
-        self.display_image = None  # Image for canvas display
+        self.display_image = None  # Visible part of the image as last drawn on the canvas
+        self.view = None  # image_engine.Viewport: zoom and pan of the left canvas
+        self.canvas_image_id = None  # Persistent image item on the left canvas
+        self.view_after_id = None  # Pending canvas redraw after zoom/pan
+        self.last_view_time = 0.0
+        self.view_latency = deque(maxlen=500)  # Canvas redraw times (ms)
+        self.pan_start = None  # Last pointer position while panning
+        self.dragging = False  # True between crop mouse down and mouse up
+        self.provisional = False  # Canvas shows a reduced decode; editing waits for full resolution
+        self.load_started = None  # When the current load was requested
+        self.first_painted = False  # The current load already showed a reduced decode
+        self.first_paint_latency = deque(maxlen=100)  # Load request to first canvas paint (ms)
+        self.load_latency = deque(maxlen=100)  # Load request to full resolution image (ms)
         self.tk_image = None  # Image in tkinter format
         self.tk_cropped = None  # Cropped image in tkinter format
         self.rect = None  # Crop rectangle on canvas
         self.start_x = self.start_y = self.end_x = self.end_y = None
-        self.crop_rect_id = None
+        self.crop_rect_id = None  # Persistent crop rectangle item, moved with coords() while dragging
+        self.preview_item_id = None  # Persistent image item on the cropped canvas
+        self.crop_box = None  # (x0, y0, x1, y1) of the current crop in the original image
         self.current_scale = 1.0  # Track the current resize scale
+        self.preview_image = None  # Last array shown on the cropped canvas
+        self.preview_is_draft = False  # preview_image is a fast draft whose refine has not arrived
+        self.image_pyramid = None  # Cached downsampled levels of the original image
+        self.crop_pyramid = None  # Cached downsampled levels of the current crop
+        self.crop_pyramid_box = None  # Crop box the crop pyramid was built for
+
+        # Background preview rendering: fast preview on the Tk thread, high quality one on a worker
+        self.preview_worker = editor_workers.LatestOnlyWorker()
+        self.refine_after_id = None  # Pending settle timer
+        self.refine_start = None  # When the current high quality render was requested
+        self.preview_latency = deque(maxlen=500)  # Slider-to-paint times of fast previews (ms)
+        self.refine_latency = deque(maxlen=500)  # Request-to-paint times of high quality previews (ms)
+
+        # Crop drag handling: motion events are coalesced to at most one overlay update per frame
+        self.drag_after_id = None  # Pending overlay update
+        self.drag_event_time = None  # Arrival of the oldest motion event not yet drawn
+        self.last_overlay_time = 0.0
+        self.drag_latency = deque(maxlen=500)  # Motion-event-to-render times (ms)
 
-        # History stack for undo functionality
-        self.history = []
-        self.max_history = 10  # Max undo steps
+        # Loads and saves run on a background thread so the window never freezes
+        self.io_worker = editor_workers.IOWorker()
+        self.pending_load = None  # Load job in flight, replaced if another file is opened
+        self.io_polling = False
+
+        # Folder sessions: decoded images are cached and the neighbours prefetched in the background
+        self.session = None  # image_session.ImageSession while browsing a folder
+        self.image_path = None  # File the current image came from
+        self.max_cache_bytes = 1024 * 1024 * 1024
+        self.image_cache = image_session.DecodedImageCache(self.max_cache_bytes)
+        self.prefetch_worker = editor_workers.IOWorker(name="prefetch-worker")
+        self.prefetching = set()  # Paths queued or decoding on the prefetch worker
+        self.awaited_path = None  # Path the user switched to while it was still being prefetched
+        self.restoring = False  # Set while the slider is moved by undo/redo
+
+        # Operation history for undo/redo, capped by memory instead of step count
+        self.max_history_bytes = 32 * 1024 * 1024
+        self.history = EditHistory(self.max_history_bytes)
 
         # Create GUI components
         self.create_widgets()
@@ -41,6 +231,17 @@ class ImageEditorApp:
         self.load_btn = tk.Button(self.button_frame, text="Load Image", command=self.load_image)
         self.load_btn.pack(side=tk.LEFT, padx=5)
 
+        # Buttons to open a folder and step through its images (also the Left/Right keys)
+        self.folder_btn = tk.Button(self.button_frame, text="Open Folder", command=self.open_folder)
+        self.folder_btn.pack(side=tk.LEFT, padx=5)
+        self.prev_btn = tk.Button(self.button_frame, text="< Prev", command=self.show_previous)
+        self.prev_btn.pack(side=tk.LEFT, padx=5)
+        self.next_btn = tk.Button(self.button_frame, text="Next >", command=self.show_next)
+        self.next_btn.pack(side=tk.LEFT, padx=5)
+        self.root.bind("<Left>", lambda event: self.show_previous())
+        self.root.bind("<Right>", lambda event: self.show_next())
+        self.root.bind("<Control-t>", lambda event: self.export_trace())  # Timings for a trace viewer
+
         # Button to save the cropped image
         self.save_btn = tk.Button(self.button_frame, text="Save Image", command=self.save_cropped)
         self.save_btn.pack(side=tk.LEFT, padx=5)
@@ -50,6 +251,18 @@ class ImageEditorApp:
         self.undo_btn.pack(side=tk.LEFT, padx=5)
         self.undo_btn.config(state=tk.DISABLED)
 
+        # Redo button (disabled initially)
+        self.redo_btn = tk.Button(self.button_frame, text="Redo", command=self.redo_action)
+        self.redo_btn.pack(side=tk.LEFT, padx=5)
+        self.redo_btn.config(state=tk.DISABLED)
+
+        # Progress of background loads/saves and a button to cancel them
+        self.cancel_io_btn = tk.Button(self.button_frame, text="Cancel", command=self.cancel_io)
+        self.cancel_io_btn.pack(side=tk.RIGHT, padx=5)
+        self.cancel_io_btn.config(state=tk.DISABLED)
+        self.io_status = tk.Label(self.button_frame, text="", bg="lightgray")
+        self.io_status.pack(side=tk.RIGHT, padx=5)
+
         # Frames to organize layout
         self.left_frame = tk.Frame(self.root, width=600, height=600, bg="gray")
         self.left_frame.pack(side=tk.LEFT, padx=10, pady=10)
@@ -62,6 +275,12 @@ class ImageEditorApp:
         self.canvas.bind("<ButtonPress-1>", self.on_mouse_down)  # Start crop
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)  # Drawing crop rectangle
         self.canvas.bind("<ButtonRelease-1>", self.on_mouse_up)  # Finalize crop
+        self.canvas.bind("<MouseWheel>", self.on_zoom)  # Zoom (Windows/macOS)
+        self.canvas.bind("<Button-4>", self.on_zoom)  # Zoom in (Linux)
+        self.canvas.bind("<Button-5>", self.on_zoom)  # Zoom out (Linux)
+        self.canvas.bind("<ButtonPress-3>", self.on_pan_start)  # Pan with the right button
+        self.canvas.bind("<B3-Motion>", self.on_pan_drag)
+        self.canvas.bind("<Double-Button-3>", lambda event: self.fit_view())  # Back to the whole image
 
         # Label and canvas for showing the cropped image
         self.cropped_label = tk.Label(self.right_frame, text="Cropped Image", bg="lightgray")
@@ -76,162 +295,613 @@ class ImageEditorApp:
         self.resize_slider.set(100)  # Default 100% scale
         self.resize_slider.pack(fill=tk.X, padx=20, pady=10)
 
+    def current_state(self):
+        """Return the current crop and scale as a lightweight history record"""
+        return EditState(self.crop_box, self.current_scale)
+
+    @editor_trace.traced()
     def push_to_history(self):
-        """Save the current cropped image state to history for undo"""
+        """Save the current crop/scale operation to history for undo"""
         if self.cropped_image is None:
             return
-        img_bytes = cv2.imencode('.png', cv2.cvtColor(self.cropped_image, cv2.COLOR_RGB2BGR))[1].tobytes()
-        scale = self.current_scale
-        self.history.append((img_bytes, scale))
-        if len(self.history) > self.max_history:
-            self.history.pop(0)
-        self.undo_btn.config(state=tk.NORMAL)  # Enable undo
+        self.history.push(self.current_state(), self.snapshot_pixels())
+        self.update_history_buttons()
+
+    def snapshot_pixels(self):
+        """Preview pixels worth keeping in the history: refined ones only, never a fast draft"""
+        return None if self.preview_is_draft else self.preview_image
 
+    def update_history_buttons(self):
+        """Enable or disable the undo/redo buttons to match the history"""
+        self.undo_btn.config(state=tk.NORMAL if self.history.can_undo() else tk.DISABLED)
+        self.redo_btn.config(state=tk.NORMAL if self.history.can_redo() else tk.DISABLED)
+
+    @editor_trace.traced()
     def undo_action(self):
         """Undo the last cropping or resizing action"""
-        if not self.history:
-            return
-        img_bytes, scale = self.history.pop()
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        self.cropped_image = cv2.cvtColor(cv2.imdecode(nparr, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
-        self.current_scale = scale
-        self.resize_slider.set(scale * 100)
-        self.show_cropped_image(self.cropped_image)
-        if not self.history:
-            self.undo_btn.config(state=tk.DISABLED)
+        state = self.history.undo(self.current_state(), self.snapshot_pixels())
+        if state is not None:
+            self.restore_state(state)
+        self.update_history_buttons()
+
+    @editor_trace.traced()
+    def redo_action(self):
+        """Redo the last undone cropping or resizing action"""
+        state = self.history.redo(self.current_state(), self.snapshot_pixels())
+        if state is not None:
+            self.restore_state(state)
+        self.update_history_buttons()
+
+    @editor_trace.traced()
+    def restore_state(self, state):
+        """Re-apply a recorded crop/scale by slicing the original image"""
+        self.crop_box = state.crop_box
+        self.cropped_image = image_engine.crop(self.image, state.crop_box)
+        self.place_crop_rect()
+        self.current_scale = state.scale
+        self.set_slider(state.scale)
+        snapshot = self.history.get_snapshot(state)
+        if snapshot is not None:
+            self.cancel_refine()
+            self.show_preview(snapshot)
+        else:
+            self.render_preview()
+
+    def set_slider(self, scale):
+        """Move the resize slider without recording a history entry"""
+        self.restoring = True
+        try:
+            self.resize_slider.set(scale * 100)
+        finally:
+            self.restoring = False
 
     def load_image(self):
         """Open a file dialog to select and load an image"""
-        file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif")])
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif;*.tif;*.tiff;*.npy;*.raw")]
+        )
         if not file_path:
             return
-        self.image = cv2.cvtColor(cv2.imread(file_path), cv2.COLOR_BGR2RGB)
-        self.display_image = self.image.copy()
+        self.store_image_state()
+        self.session = None  # A single file ends folder browsing
+        self.open_path(file_path)
+
+    def open_folder(self):
+        """Open a folder and show its first image"""
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+        session = image_session.ImageSession(folder)
+        if not session.files:
+            messagebox.showerror("Error", "No images found in this folder.")
+            return
+        self.store_image_state()
+        self.session = session
+        self.open_path(session.current())
+
+    def show_next(self):
+        self.step_session(1)
+
+    def show_previous(self):
+        self.step_session(-1)
+
+    def step_session(self, delta):
+        """Switch to another image of the folder, keeping this one's edits"""
+        if self.session is None:
+            return
+        self.store_image_state()
+        path = self.session.step(delta)
+        if path is not None:
+            self.open_path(path)
+
+    def store_image_state(self):
+        """Remember the current crop/scale and history so switching back restores them"""
+        if self.session is None or self.image_path is None:
+            return
+        # Only the operations are kept per image, so a long session costs no pixels beyond the image cache
+        self.history.drop_snapshots()
+        self.session.states[self.image_path] = (self.current_state(), self.history)
+
+    def open_path(self, file_path):
+        """Show an image from the cache at once, or load it in the background"""
+        if self.pending_load is not None:
+            self.pending_load.cancel()  # Only the most recently chosen file matters
+            self.pending_load = None
+        self.awaited_path = None
+        self.load_started = time.perf_counter()
+        self.first_painted = False
+        cached = self.image_cache.get(file_path)
+        if cached is not None:
+            self.finish_load((file_path,) + cached)
+        elif file_path in self.prefetching:
+            self.awaited_path = file_path  # Already decoding; shown by finish_prefetch
+        else:
+            self.pending_load = self.io_worker.submit(
+                f"Loading {os.path.basename(file_path)}", load_image_job, file_path,
+                on_done=self.finish_load, on_error=self.load_failed, on_partial=self.show_first_paint
+            )
+        self.prefetch_neighbors()
+        self.watch_io()
+
+    def prefetch_neighbors(self):
+        """Decode the next and previous images of the folder in the background"""
+        if self.session is None:
+            return
+        wanted = self.session.neighbors()
+        for job in self.prefetch_worker.pending:
+            path = job.args[0]
+            if path not in wanted and path != self.awaited_path:
+                job.cancel()  # The user has moved on
+                self.prefetching.discard(path)
+        for path in wanted:
+            if path in self.image_cache or path in self.prefetching:
+                continue
+            self.prefetching.add(path)
+            self.prefetch_worker.submit(
+                "Prefetching", load_image_job, path,
+                on_done=self.finish_prefetch, on_error=lambda error, path=path: self.prefetching.discard(path)
+            )
+
+    def finish_prefetch(self, result):
+        """Runs on the Tk thread when a prefetched image is decoded"""
+        path, image, pyramid = result
+        self.prefetching.discard(path)
+        self.image_cache.put(path, image, pyramid)
+        if path == self.awaited_path:
+            self.awaited_path = None
+            self.finish_load(result)
+
+    @editor_trace.traced()
+    def show_first_paint(self, result):
+        """Runs on the Tk thread: show a reduced decode while the full image is still decoding"""
+        file_path, reduced = result
+        self.provisional = True
+        self.cancel_drag()  # The gesture was on the image being replaced
+        self.canvas.delete("all")
+        self.canvas_image_id = None
+        self.crop_rect_id = None
+        rendered = image_engine.render_viewport(reduced, image_engine.fit_viewport(reduced.shape))
+        if rendered is not None:
+            self.draw_canvas_pixels(*rendered)
+        if self.load_started is not None:
+            self.first_paint_latency.append((time.perf_counter() - self.load_started) * 1000)
+            self.first_painted = True
+
+    def end_provisional(self):
+        """Put the current image back after a load that painted a preview was cancelled or failed"""
+        if not self.provisional:
+            return
+        self.provisional = False
+        self.cancel_drag()
+        self.canvas.delete("all")
+        self.canvas_image_id = None
+        self.crop_rect_id = None
+        if self.image is not None:
+            self.redraw_view()
+
+    def load_failed(self, error):
+        self.pending_load = None
+        self.end_provisional()
+        self.io_failed(error)
+
+    @editor_trace.traced()
+    def finish_load(self, result):
+        """Runs on the Tk thread once an image is decoded (or found in the cache)"""
+        self.pending_load = None
+        self.provisional = False
+        if self.load_started is not None:
+            latency = (time.perf_counter() - self.load_started) * 1000
+            self.load_latency.append(latency)
+            if not self.first_painted:
+                self.first_paint_latency.append(latency)  # No reduced decode: first paint is this one
+            self.load_started = None
+        file_path, self.image, pyramid = result
+        self.image_cache.put(file_path, self.image, pyramid)
+        self.image_path = file_path
+        self.cancel_refine()
+        self.image_pyramid = pyramid  # New source, so every cached level is stale
+        self.crop_pyramid = None
         self.show_image_on_canvas(self.image)
         self.cropped_image = None
+        self.crop_box = None
+        self.preview_image = None
+        self.preview_is_draft = False
         self.tk_cropped = None
         self.cropped_canvas.delete("all")
-        self.resize_slider.set(100)
+        self.preview_item_id = None
         self.current_scale = 1.0
-        self.history = []
-        self.undo_btn.config(state=tk.DISABLED)
+        self.set_slider(1.0)
+
+        # Bring back the edits made the last time this image was open in the session
+        saved = self.session.states.get(file_path) if self.session is not None else None
+        self.history = saved[1] if saved else EditHistory(self.max_history_bytes)
+        self.update_history_buttons()
+        if saved and saved[0].crop_box is not None:
+            self.restore_state(saved[0])
+        if self.session is not None:
+            self.root.title(f"Image Editor - {os.path.basename(file_path)} "
+                            f"({self.session.index + 1}/{len(self.session.files)})")
 
+    @editor_trace.traced()
     def show_image_on_canvas(self, img):
-        """Display an image on the left canvas"""
-        h, w = img.shape[:2]
-        scale = min(600 / w, 600 / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = cv2.resize(img, (new_w, new_h))
-        self.tk_image = ImageTk.PhotoImage(Image.fromarray(resized))
+        """Display an image on the left canvas, zoomed to fit"""
+        source = img
+        if isinstance(img, tiled_image.TiledImage):
+            source = img.overview(image_engine.CANVAS_SIZE)  # Low resolution level, never the full image
+        if self.image_pyramid is None or self.image_pyramid.source is not source:
+            self.image_pyramid = image_engine.ImagePyramid(source)
+        self.view = image_engine.fit_viewport(img.shape)
+        self.cancel_drag()
         self.canvas.delete("all")
-        self.canvas.create_image(300, 300, image=self.tk_image, anchor=tk.CENTER)
-        self.img_disp_size = (new_w, new_h)
-        self.img_disp_offset = ((600 - new_w) // 2, (600 - new_h) // 2)
+        self.canvas_image_id = None
+        self.crop_rect_id = None
+        self.redraw_view()
+
+    @editor_trace.traced()
+    def redraw_view(self):
+        """Resample just the visible part of the image at the current zoom and draw it"""
+        start = time.perf_counter()
+        self.view_after_id = None
+        # Finest pyramid level in image pixels per canvas pixel (below 1 for a tiled image's overview)
+        detail = self.image_pyramid.source.shape[1] / self.image.shape[1]
+        interpolation = cv2.INTER_NEAREST if self.view.zoom >= 4 else None  # Show pixels when zoomed in
+        if self.view.zoom > detail:
+            # More detail than the pyramid holds: read only the visible pixels, and when zoomed
+            # out skip the rows/columns that resampling would average away anyway
+            source, view = self.image, self.view
+            step = int(1 / (2 * view.zoom))
+            if step > 1:
+                source = self.image[::step, ::step]  # Lazy strided view, nothing is read yet
+                view = view._replace(x=view.x / step, y=view.y / step, zoom=view.zoom * step)
+            rendered = image_engine.render_viewport(source, view, interpolation=interpolation)
+            self.release_source()
+        else:
+            rendered = image_engine.render_viewport(self.image, self.view, self.image_pyramid, interpolation)
+        if rendered is None:
+            return
+        self.draw_canvas_pixels(*rendered)
+        self.place_crop_rect()
+        now = time.perf_counter()
+        self.last_view_time = now
+        self.view_latency.append((now - start) * 1000)
+
+    def draw_canvas_pixels(self, pixels, x, y):
+        """Put rendered pixels on the left canvas at (x, y), reusing one image item"""
+        self.display_image = pixels
+        self.tk_image = ImageTk.PhotoImage(Image.fromarray(pixels))
+        if self.canvas_image_id is None:
+            self.canvas_image_id = self.canvas.create_image(x, y, image=self.tk_image, anchor=tk.NW)
+            self.canvas.tag_lower(self.canvas_image_id)  # Keep it under the crop rectangle
+        else:
+            self.canvas.itemconfigure(self.canvas_image_id, image=self.tk_image)
+            self.canvas.coords(self.canvas_image_id, x, y)
+
+    def schedule_view_redraw(self):
+        """Redraw at most once per display frame however many zoom/pan events arrive"""
+        if self.view_after_id is None:
+            wait = max(0, FRAME_MS - (time.perf_counter() - self.last_view_time) * 1000)
+            self.view_after_id = self.root.after(int(wait), self.redraw_view)
+
+    def place_crop_rect(self):
+        """Draw the crop rectangle around the current crop box at the current zoom"""
+        if self.dragging or self.crop_box is None:
+            return
+        x0, y0, x1, y1 = self.crop_box
+        cx0, cy0 = image_engine.image_to_canvas_coords(x0, y0, self.view)
+        cx1, cy1 = image_engine.image_to_canvas_coords(x1, y1, self.view)
+        if self.crop_rect_id is None:
+            self.crop_rect_id = self.canvas.create_rectangle(cx0, cy0, cx1, cy1, outline="red", width=2)
+        else:
+            self.canvas.coords(self.crop_rect_id, cx0, cy0, cx1, cy1)
+
+    def on_zoom(self, event):
+        """Zoom in or out around the mouse pointer"""
+        if self.image is None or self.provisional:
+            return
+        zoom_in = event.num == 4 or getattr(event, "delta", 0) > 0
+        factor = 1.25 if zoom_in else 0.8
+        self.view = image_engine.zoom_viewport(self.view, self.image.shape, factor, event.x, event.y)
+        self.schedule_view_redraw()
+
+    def on_pan_start(self, event):
+        self.pan_start = (event.x, event.y)
+
+    def on_pan_drag(self, event):
+        """Drag the image around with the right mouse button"""
+        if self.image is None or self.provisional or self.pan_start is None:
+            return
+        dx, dy = event.x - self.pan_start[0], event.y - self.pan_start[1]
+        self.pan_start = (event.x, event.y)
+        self.view = image_engine.pan_viewport(self.view, self.image.shape, dx, dy)
+        self.schedule_view_redraw()
+
+    def fit_view(self):
+        if self.image is None:
+            return
+        self.view = image_engine.fit_viewport(self.image.shape)
+        self.schedule_view_redraw()
 
     def on_mouse_down(self, event):
         """Start drawing the crop rectangle"""
-        if self.image is None:
+        if self.image is None or self.provisional:
             return
         self.start_x = event.x
         self.start_y = event.y
         self.end_x = event.x
         self.end_y = event.y
-        if self.crop_rect_id:
-            self.canvas.delete(self.crop_rect_id)
-            self.crop_rect_id = None
+        self.dragging = True
+        self.cancel_refine()
+        if self.crop_rect_id is None:
+            self.crop_rect_id = self.canvas.create_rectangle(
+                self.start_x, self.start_y, self.end_x, self.end_y,
+                outline="red", width=2
+            )
+        else:
+            self.canvas.coords(self.crop_rect_id, self.start_x, self.start_y, self.end_x, self.end_y)
 
     def on_mouse_drag(self, event):
-        """Draw the crop rectangle as the mouse moves"""
-        if self.image is None:
+        """Record the pointer and schedule at most one overlay update per display frame"""
+        if self.image is None or self.provisional or not self.dragging:
             return
         self.end_x = event.x
         self.end_y = event.y
-        if self.crop_rect_id:
-            self.canvas.delete(self.crop_rect_id)
-        self.crop_rect_id = self.canvas.create_rectangle(
-            self.start_x, self.start_y, self.end_x, self.end_y,
-            outline="red", width=2
+        if self.drag_after_id is None:
+            now = time.perf_counter()
+            self.drag_event_time = now
+            wait = max(0, FRAME_MS - (now - self.last_overlay_time) * 1000)
+            self.drag_after_id = self.root.after(int(wait), self.update_crop_overlay)
+
+    @editor_trace.traced()
+    def update_crop_overlay(self):
+        """Move the crop rectangle to the latest pointer position and preview the selected pixels"""
+        self.drag_after_id = None
+        if not self.dragging:
+            return
+        self.canvas.coords(self.crop_rect_id, self.start_x, self.start_y, self.end_x, self.end_y)
+        box = self.selection_box()
+        if box is not None:
+            selection = image_engine.TransformPipeline(self.image.shape).crop(box)
+            self.paint_preview(image_engine.render_fitted(selection, self.image, 400, 400, self.image_pyramid))
+        now = time.perf_counter()
+        self.last_overlay_time = now
+        if self.drag_event_time is not None:
+            self.drag_latency.append((now - self.drag_event_time) * 1000)
+            self.drag_event_time = None
+
+    def cancel_drag(self):
+        """Abandon a crop drag in progress, e.g. when a new image replaces the canvas under it"""
+        self.dragging = False
+        if self.drag_after_id is not None:
+            self.root.after_cancel(self.drag_after_id)
+            self.drag_after_id = None
+        self.drag_event_time = None
+
+    def selection_box(self):
+        """Return the image box under the current drag rectangle, or None if it is too small"""
+        return image_engine.crop_box_from_canvas(
+            (self.start_x, self.start_y), (self.end_x, self.end_y),
+            self.image.shape, self.view
         )
 
+    @editor_trace.traced()
     def on_mouse_up(self, event):
         """Complete the crop and extract the selected image area"""
-        if self.image is None:
-            return
+        if self.image is None or self.provisional or not self.dragging:
+            return  # No drag, or it was cancelled by a new image
+        self.cancel_drag()
         self.end_x = event.x
         self.end_y = event.y
-        x0, y0 = self.canvas_to_image_coords(self.start_x, self.start_y)
-        x1, y1 = self.canvas_to_image_coords(self.end_x, self.end_y)
-        x0, x1 = sorted([max(0, x0), max(0, x1)])
-        y0, y1 = sorted([max(0, y0), max(0, y1)])
-        if x1 - x0 < 5 or y1 - y0 < 5:
+        self.canvas.coords(self.crop_rect_id, self.start_x, self.start_y, self.end_x, self.end_y)
+        box = self.selection_box()
+        if box is None:
+            # Selection too small: put back the preview and rectangle of the current crop
+            if self.preview_image is not None:
+                self.paint_preview(self.preview_image)
+            self.place_crop_rect()
             return
         if self.cropped_image is not None:
             self.push_to_history()
-        self.cropped_image = self.image[y0:y1, x0:x1]
+        self.crop_box = box
+        self.cropped_image = image_engine.crop(self.image, box)  # A view, no pixels are copied
         self.current_scale = 1.0
+        self.set_slider(1.0)
         self.show_cropped_image(self.cropped_image)
-        self.resize_slider.set(100)
+        self.place_crop_rect()  # Snap the rectangle to the pixels actually cropped
+        self.release_source()
 
     def canvas_to_image_coords(self, x, y):
-        """Convert canvas coordinates to image coordinates"""
-        offset_x, offset_y = self.img_disp_offset
-        scale_x = self.image.shape[1] / self.img_disp_size[0]
-        scale_y = self.image.shape[0] / self.img_disp_size[1]
-        img_x = int((x - offset_x) * scale_x)
-        img_y = int((y - offset_y) * scale_y)
-        img_x = np.clip(img_x, 0, self.image.shape[1] - 1)
-        img_y = np.clip(img_y, 0, self.image.shape[0] - 1)
-        return img_x, img_y
+        """Convert canvas coordinates to image coordinates through the current zoom/pan"""
+        return image_engine.canvas_to_image_coords(x, y, self.image.shape, self.view)
 
+    @editor_trace.traced()
     def show_cropped_image(self, img):
         """Display the cropped image in the right canvas"""
+        self.cancel_refine()
         if img is None or img.size == 0:
             self.cropped_canvas.delete("all")
+            self.preview_item_id = None
             return
-        h, w = img.shape[:2]
-        scale = min(400 / w, 400 / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = cv2.resize(img, (new_w, new_h))
-        self.tk_cropped = ImageTk.PhotoImage(Image.fromarray(resized))
-        self.cropped_canvas.delete("all")
-        self.cropped_canvas.create_image(200, 200, image=self.tk_cropped, anchor=tk.CENTER)
+        self.show_preview(image_engine.render_fitted(
+            self.edit_pipeline(), self.image, 400, 400, self.get_crop_pyramid(), self.crop_box
+        ))
+
+    def edit_pipeline(self):
+        """Return the current crop and scale as a lazy transform of the original image"""
+        return image_engine.TransformPipeline(self.image.shape).crop(self.crop_box).scale(self.current_scale)
+
+    def get_crop_pyramid(self):
+        """Return the pyramid of the current crop, rebuilding it only when the crop changed"""
+        if self.crop_pyramid is None or self.crop_pyramid_box != self.crop_box:
+            source = self.cropped_image
+            if isinstance(self.image, tiled_image.TiledImage):
+                # Never pyrDown the memory-mapped crop: start from a strided copy twice the preview size
+                source = self.image.overview(800, self.crop_box)
+            self.crop_pyramid = image_engine.ImagePyramid(source)
+            self.crop_pyramid_box = self.crop_box
+        return self.crop_pyramid
+
+    def show_preview(self, display_img, draft=False):
+        """Put an already sized preview array on the right canvas; draft marks a fast preview"""
+        self.preview_image = display_img
+        self.preview_is_draft = draft
+        self.paint_preview(display_img)
+
+    def paint_preview(self, display_img):
+        """Draw pixels on the cropped canvas, reusing one image item"""
+        self.tk_cropped = ImageTk.PhotoImage(Image.fromarray(display_img))
+        if self.preview_item_id is None:
+            self.preview_item_id = self.cropped_canvas.create_image(200, 200, image=self.tk_cropped, anchor=tk.CENTER)
+        else:
+            self.cropped_canvas.itemconfigure(self.preview_item_id, image=self.tk_cropped)
 
+    @editor_trace.traced()
     def resize_cropped(self, val):
         """Resize the cropped image based on the slider value"""
-        if self.cropped_image is None:
+        if self.cropped_image is None or self.restoring:
             return
         scale = float(val) / 100.0
         if scale != self.current_scale and self.current_scale == 1.0:
             self.push_to_history()
         self.current_scale = scale
-        h, w = self.cropped_image.shape[:2]
-        new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
-        resized = cv2.resize(self.cropped_image, (new_w, new_h))
-        disp_scale = min(400 / new_w, 400 / new_h)
-        disp_w, disp_h = int(new_w * disp_scale), int(new_h * disp_scale)
-        display_img = cv2.resize(resized, (disp_w, disp_h))
-        self.tk_cropped = ImageTk.PhotoImage(Image.fromarray(display_img))
-        self.cropped_canvas.delete("all")
-        self.cropped_canvas.create_image(200, 200, image=self.tk_cropped, anchor=tk.CENTER)
+        self.render_preview()
+
+    def render_preview(self):
+        """Paint a fast preview now and refine it in the background once the slider settles"""
+        start = time.perf_counter()
+        self.show_preview(image_engine.render_fitted(
+            self.edit_pipeline(), self.image, 400, 400, self.get_crop_pyramid(), self.crop_box, fast=True
+        ), draft=True)
+        self.preview_latency.append((time.perf_counter() - start) * 1000)
+        if self.refine_after_id is not None:
+            self.root.after_cancel(self.refine_after_id)
+        self.refine_after_id = self.root.after(SETTLE_MS, self.start_refine)
+
+    def start_refine(self):
+        """Hand the high quality render to the worker; only the newest request survives"""
+        self.refine_after_id = None
+        self.refine_start = time.perf_counter()
+        self.preview_worker.submit(
+            render_refined, self.edit_pipeline(), self.image, 400, 400,
+            self.get_crop_pyramid(), self.crop_box
+        )
+        self.root.after(POLL_MS, self.poll_refine)
+
+    def poll_refine(self):
+        """Runs on the Tk thread: paint a finished high quality preview if one is ready"""
+        display_img = self.preview_worker.poll()
+        if display_img is not None:
+            self.show_preview(display_img)
+            self.refine_latency.append((time.perf_counter() - self.refine_start) * 1000)
+        if self.preview_worker.busy():
+            self.root.after(POLL_MS, self.poll_refine)
+        else:
+            self.release_source()
+
+    def cancel_refine(self):
+        """Drop any pending or running high quality render"""
+        if self.refine_after_id is not None:
+            self.root.after_cancel(self.refine_after_id)
+            self.refine_after_id = None
+        self.preview_worker.cancel()
+
+    def latency_stats(self):
+        """Summarize preview and drag latencies in ms and whether fast previews fit in one frame"""
+        stats = {}
+        for name, samples in (("preview", self.preview_latency), ("refine", self.refine_latency),
+                              ("drag", self.drag_latency), ("view", self.view_latency),
+                              ("first_paint", self.first_paint_latency), ("load", self.load_latency)):
+            if samples:
+                ordered = sorted(samples)
+                stats[name] = {
+                    "p50": ordered[len(ordered) // 2],
+                    "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "max": ordered[-1],
+                }
+        if "preview" in stats:
+            stats["within_frame"] = stats["preview"]["p95"] <= FRAME_MS
+        return stats
+
+    def release_source(self):
+        """Drop memory-mapped pages of a tiled source once a render has used them"""
+        if isinstance(self.image, tiled_image.TiledImage):
+            self.image.release()
 
     def save_cropped(self):
         """Save the cropped image to a file"""
         if self.cropped_image is None:
             messagebox.showerror("Error", "No cropped image to save.")
             return
-        h, w = self.cropped_image.shape[:2]
-        new_w, new_h = max(1, int(w * self.current_scale)), max(1, int(h * self.current_scale))
-        img_to_save = cv2.resize(self.cropped_image, (new_w, new_h))
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
             filetypes=[("PNG Image", "*.png"), ("JPEG Image", "*.jpg;*.jpeg")]
         )
+        if file_path:
+            self.save_to(file_path)
+
+    @editor_trace.traced()
+    def save_to(self, file_path):
+        """Queue a background save of the current edit to file_path"""
+        # The source image is never modified in place, so the worker can read it while editing goes on
+        self.io_worker.submit(
+            f"Saving {os.path.basename(file_path)}", save_image_job,
+            file_path, self.image, self.edit_pipeline(),
+            on_done=self.finish_save, on_error=self.io_failed
+        )
+        self.watch_io()
+
+    def export_trace(self):
+        """Save the recorded operation timings as a Chrome trace (open in Perfetto or chrome://tracing)"""
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Trace", "*.json")])
         if not file_path:
             return
-        img_to_save = cv2.cvtColor(img_to_save, cv2.COLOR_RGB2BGR)
-        cv2.imwrite(file_path, img_to_save)
+        try:
+            editor_trace.tracer.export(file_path)
+        except OSError as e:
+            messagebox.showerror("Error", str(e))
+
+    def finish_save(self, file_path):
         messagebox.showinfo("Saved", f"Image saved to {file_path}")
 
+    def io_failed(self, error):
+        messagebox.showerror("Error", str(error))
+
+    def watch_io(self):
+        """Start polling the I/O worker if we are not already"""
+        self.update_io_status()
+        if not self.io_polling:
+            self.io_polling = True
+            self.root.after(IO_POLL_MS, self.poll_io)
+
+    def poll_io(self):
+        """Runs on the Tk thread: deliver finished loads/saves and refresh the progress text"""
+        self.io_worker.poll()
+        self.prefetch_worker.poll()
+        self.update_io_status()
+        if self.io_worker.busy() or self.prefetch_worker.busy():
+            self.root.after(IO_POLL_MS, self.poll_io)
+        else:
+            self.io_polling = False
+
+    def update_io_status(self):
+        jobs = self.io_worker.pending
+        if not jobs:
+            waiting = f"Loading {os.path.basename(self.awaited_path)}..." if self.awaited_path else ""
+            self.io_status.config(text=waiting)
+            self.cancel_io_btn.config(state=tk.DISABLED)
+            return
+        text = f"{jobs[0].label}... {int(jobs[0].progress * 100)}%"
+        if len(jobs) > 1:
+            text += f" (+{len(jobs) - 1} queued)"
+        self.io_status.config(text=text)
+        self.cancel_io_btn.config(state=tk.NORMAL)
+
+    def cancel_io(self):
+        """Cancel the running load/save and everything queued behind it"""
+        self.io_worker.cancel_all()
+        self.pending_load = None
+        self.awaited_path = None
+        self.end_provisional()
+
 # Start the application
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,145 @@
+# Import necessary modules
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import second_question as game  # The simulation only; no window is opened
+from game_input import Controls
+
+# ----------------------------
+# Batch Settings
+# ----------------------------
+MAX_EPISODE_SECONDS = 600  # Simulated time after which an episode is stopped unfinished
+
+
+# ----------------------------
+# Policies
+# ----------------------------
+class RandomPolicy:
+    """Random player: holds a direction for a random while, jumping and firing at random"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.held = (False, True)  # (left, right)
+        self.until = 0  # Tick to pick a new direction at
+
+    def __call__(self, sim):
+        rng = self.rng
+        if sim.tick >= self.until:
+            r = rng.random()
+            self.held = (r < 0.2, r >= 0.4)  # Left a fifth of the time, still a fifth, right the rest
+            self.until = sim.tick + rng.randint(10, 90)
+        return Controls(*self.held, rng.random() < 0.05, rng.random() < 0.15)
+
+
+# name -> policy for an episode seed; names rather than functions so jobs pickle cheaply
+POLICIES = {
+    "autopilot": lambda seed: game.autopilot,
+    "random": RandomPolicy,
+}
+
+
+# ----------------------------
+# Episodes
+# ----------------------------
+def run_episode(seed, policy="autopilot", params=None, max_seconds=MAX_EPISODE_SECONDS):
+    """Play one game headlessly until it ends (or max_seconds pass) and return its stats
+
+    params overrides fields of the default LevelParams, e.g. {"enemy_every": 2}.
+    """
+    sim = game.GameSim(seed, params=game.DEFAULT_LEVEL._replace(**(params or {})))
+    act = POLICIES[policy](seed)
+    for _ in range(int(max_seconds * game.TICK_RATE)):
+        sim.step(act(sim))
+        if sim.game_over:
+            break
+    return {
+        "seed": seed,
+        "policy": policy,
+        "score": sim.player.score,
+        "lives_lost": sim.lives_lost,
+        "enemies_killed": sim.kills,
+        "level_seconds": [ticks / game.TICK_RATE for ticks in sim.level_ticks],  # Time to clear each level
+        "levels_cleared": len(sim.level_ticks),
+        "died": sim.player.lives <= 0,
+        "seconds": sim.tick / game.TICK_RATE,
+    }
+
+
+def run_batch(seeds, policy="autopilot", params=None, max_seconds=MAX_EPISODE_SECONDS, workers=None):
+    """Run one episode per seed across a process pool; results come back in seed order
+
+    Episodes share nothing, so throughput grows with the number of workers (default: one per
+    core). workers=1 runs them in this process.
+    """
+    seeds = list(seeds)
+    if workers == 1:
+        return [run_episode(seed, policy, params, max_seconds) for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(seeds) // (workers * 4))  # Few round trips, still balanced at the end
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_episode, seeds, repeat(policy), repeat(params), repeat(max_seconds),
+                             chunksize=chunksize))
+
+
+def summarize(episodes):
+    """Averages over a batch: score, kills, lives lost, and per level how often and how fast it was cleared"""
+    n = len(episodes)
+    if not n:
+        return {}
+    levels = {}
+    for episode in episodes:
+        for level, seconds in enumerate(episode["level_seconds"], start=1):
+            levels.setdefault(level, []).append(seconds)
+    return {
+        "episodes": n,
+        "mean_score": sum(e["score"] for e in episodes) / n,
+        "mean_enemies_killed": sum(e["enemies_killed"] for e in episodes) / n,
+        "mean_lives_lost": sum(e["lives_lost"] for e in episodes) / n,
+        "died": sum(e["died"] for e in episodes) / n,
+        "levels": {level: {"cleared": len(times) / n, "mean_seconds": sum(times) / len(times)}
+                   for level, times in sorted(levels.items())},
+    }
+
+
+def parse_param(text):
+    # name=value for one LevelParams field
+    name, _, value = text.partition("=")
+    if name not in game.LevelParams._fields:
+        raise argparse.ArgumentTypeError(f"Unknown level parameter {name!r}; expected one of {game.LevelParams._fields}")
+    return name, int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many headless games in parallel and report per-episode stats")
+    parser.add_argument("--episodes", type=int, default=100, help="Number of games, one seed each")
+    parser.add_argument("--first-seed", type=int, default=0, help="Seeds are first-seed, first-seed + 1, ...")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="autopilot", help="Who plays")
+    parser.add_argument("--param", type=parse_param, action="append", default=[],
+                        help="Level parameter override as name=value (repeatable)")
+    parser.add_argument("--max-seconds", type=float, default=MAX_EPISODE_SECONDS, help="Simulated time limit per game")
+    parser.add_argument("--workers", type=int, default=None, help="Processes to use (default: one per core)")
+    parser.add_argument("--json", default=None, help="Write every episode's stats to this JSON file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    seeds = range(args.first_seed, args.first_seed + args.episodes)
+    episodes = run_batch(seeds, args.policy, dict(args.param), args.max_seconds, args.workers)
+    wall = time.perf_counter() - start
+    summary = summarize(episodes)
+    print(f"{len(episodes)} episodes in {wall:.1f} s ({len(episodes) / wall:.1f} per second)")
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "episodes": episodes}, f, indent=2)
+    return 0
+
+
+# Run from the command line
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+# Import necessary modules
+import numpy as np
+
+NO_INDEX = np.iinfo(np.int64).max  # Marks "no enemy" when picking the first enemy a bullet hits
+SCALAR_LIMIT = 16  # Up to this many enemies plain loops beat NumPy's per-call overhead
+SCALAR_PAIRS = 256  # Up to this many bullet-enemy pairs a plain loop beats the sort-and-sweep
+
+
+# ----------------------------
+# Struct-of-Arrays Storage
+# ----------------------------
+class EntityArrays:
+    """One NumPy array per field; live entities are packed at the front, in spawn order"""
+
+    FIELDS = {}  # field name -> dtype, set by subclasses
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = capacity
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype))
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def grow(self):
+        """Double the arrays; slots are never given back, so a busy fight only grows them once"""
+        self.capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            grown = np.zeros(self.capacity, old.dtype)
+            grown[:self.count] = old[:self.count]
+            setattr(self, name, grown)
+
+    def append(self, **values):
+        """Add one entity in the next free slot; returns its index"""
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        for name, value in values.items():
+            getattr(self, name)[i] = value
+        self.count += 1
+        return i
+
+    def live(self, name):
+        """The live part of one field (a view, writes go to the store)"""
+        return getattr(self, name)[:self.count]
+
+    def keep(self, mask):
+        """Drop the entities where mask is False, keeping the others in order"""
+        kept = int(np.count_nonzero(mask))
+        if kept == self.count:
+            return
+        for name in self.FIELDS:
+            array = getattr(self, name)
+            array[:kept] = array[:self.count][mask]
+        self.count = kept
+
+    def clear(self):
+        """Free every slot, keeping the arrays for the next entities"""
+        self.count = 0
+
+    @classmethod
+    def record_dtype(cls):
+        """NumPy dtype of one entity in take()/records() arrays"""
+        return np.dtype(list(cls.FIELDS.items()))
+
+    def take(self, mask):
+        """Remove the entities where mask is True and return them as one compact record array"""
+        records = np.empty(int(np.count_nonzero(mask)), self.record_dtype())
+        for name in self.FIELDS:
+            records[name] = self.live(name)[mask]
+        self.keep(~mask)
+        return records
+
+    def records(self):
+        """Copy of every live entity as one compact record array, in order"""
+        records = np.empty(self.count, self.record_dtype())
+        for name in self.FIELDS:
+            records[name] = self.live(name)
+        return records
+
+    def extend(self, records):
+        """Append entities returned by take(), after the live ones"""
+        while self.count + len(records) > self.capacity:
+            self.grow()
+        for name in self.FIELDS:
+            getattr(self, name)[self.count:self.count + len(records)] = records[name]
+        self.count += len(records)
+
+    def remember(self):
+        """Record positions before a step, for interpolated drawing"""
+        self.prev_x[:self.count] = self.x[:self.count]
+
+
+# ----------------------------
+# Projectiles
+# ----------------------------
+class ProjectileStore(EntityArrays):
+    """All live bullets; every bullet has the same size"""
+
+    FIELDS = {"x": np.int32, "y": np.int32, "prev_x": np.int32, "speed": np.int32}
+
+    def __init__(self, size, capacity=1024):
+        super().__init__(capacity)
+        self.w, self.h = size
+
+    def spawn(self, cx, cy, speed):
+        # Centered on (cx, cy), like rect.center = (cx, cy); fills a free slot, allocates nothing
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        self.x[i] = self.prev_x[i] = cx - self.w // 2
+        self.y[i] = cy - self.h // 2
+        self.speed[i] = speed
+        self.count += 1
+        return i
+
+    def update(self, left, right):
+        """Move every bullet and remove those that left the span of the level between left and right"""
+        x = self.live("x")
+        x += self.live("speed")
+        self.keep((x <= right) & (x + self.w >= left))
+
+
+# ----------------------------
+# Enemies
+# ----------------------------
+class EnemyStore(EntityArrays):
+    """All live enemies: walkers patrol their platform, turning around at its edges"""
+
+    FIELDS = {"x": np.int32, "y": np.int32, "prev_x": np.int32, "w": np.int32, "h": np.int32,
+              "health": np.int32, "speed": np.int32, "direction": np.int32, "boss": np.bool_}
+
+    def spawn(self, x, y, size, health, speed, boss=False):
+        w, h = size
+        return self.append(x=x, y=y, prev_x=x, w=w, h=h, health=health, speed=speed, direction=1, boss=boss)
+
+    def update(self, support):
+        """Move every enemy; reverse those whose midbottom point left the platforms"""
+        if not self.count:
+            return
+        if self.count <= SCALAR_LIMIT:
+            self.update_each(support)
+            return
+        x, step = self.live("x"), self.live("speed") * self.live("direction")
+        x += step
+        on_platform = support.contains(x + self.live("w") // 2, self.live("y") + self.live("h"))
+        off = ~on_platform
+        direction = self.live("direction")
+        direction[off] *= -1
+        x[off] += step[off] * -2
+
+    def update_each(self, support):
+        # update() one enemy at a time, for the usual handful of enemies
+        n = self.count
+        xs, ys, ws, hs = self.x[:n].tolist(), self.y[:n].tolist(), self.w[:n].tolist(), self.h[:n].tolist()
+        speeds, directions = self.speed[:n].tolist(), self.direction[:n].tolist()
+        for i in range(n):
+            step = speeds[i] * directions[i]
+            x = xs[i] + step
+            if not support.contains_point(x + ws[i] // 2, ys[i] + hs[i]):
+                directions[i] = -directions[i]
+                x -= 2 * step
+            xs[i] = x
+        self.x[:n] = xs
+        self.direction[:n] = directions
+
+    def overlapping(self, rect):
+        """Indices of enemies overlapping a pygame Rect, in spawn order"""
+        n = self.count
+        if n <= SCALAR_LIMIT:
+            left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+            boxes = zip(self.x[:n].tolist(), self.y[:n].tolist(), self.w[:n].tolist(), self.h[:n].tolist())
+            return [i for i, (x, y, w, h) in enumerate(boxes) if x < right and x + w > left and y < bottom and y + h > top]
+        x, y = self.live("x"), self.live("y")
+        return np.flatnonzero((x < rect.right) & (x + self.live("w") > rect.left)
+                              & (y < rect.bottom) & (y + self.live("h") > rect.top))
+
+    def remove_dead(self):
+        self.keep(self.live("health") > 0)
+
+
+# ----------------------------
+# Static Platform Lookup
+# ----------------------------
+class PlatformTable:
+    """Platform rects bucketed by grid cell, for answering many point queries with array operations"""
+
+    def __init__(self, platforms, cell_size=128):
+        self.cell_size = c = cell_size
+        rects = [p.rect for p in platforms]
+        # Index len(rects) is an empty sentinel rect that padded table slots point to
+        self.x0 = np.array([r.left for r in rects] + [1], np.int64)
+        self.x1 = np.array([r.right for r in rects] + [0], np.int64)
+        self.y0 = np.array([r.top for r in rects] + [1], np.int64)
+        self.y1 = np.array([r.bottom for r in rects] + [0], np.int64)
+        self.cells = {}  # (cell x, cell y) -> (left, right, top, bottom) of the platforms there, for contains_point()
+        if not rects:
+            self.cx0 = self.cy0 = 0
+            self.table = np.full((1, 1, 1), 0, np.int64)
+            return
+        self.cx0, self.cy0 = min(r.left for r in rects) // c, min(r.top for r in rects) // c
+        ncx = (max(r.right for r in rects) - 1) // c - self.cx0 + 1
+        ncy = (max(r.bottom for r in rects) - 1) // c - self.cy0 + 1
+        buckets = {}
+        for i, r in enumerate(rects):
+            for cx in range(r.left // c, (r.right - 1) // c + 1):
+                for cy in range(r.top // c, (r.bottom - 1) // c + 1):
+                    buckets.setdefault((cx - self.cx0, cy - self.cy0), []).append(i)
+                    self.cells.setdefault((cx, cy), []).append((r.left, r.right, r.top, r.bottom))
+        depth = max(len(b) for b in buckets.values())
+        self.table = np.full((ncx, ncy, depth), len(rects), np.int64)
+        for (cx, cy), members in buckets.items():
+            self.table[cx, cy, :len(members)] = members
+
+    def contains(self, xs, ys):
+        """For each point, whether any platform contains it (same test as Rect.collidepoint)"""
+        ncx, ncy, _ = self.table.shape
+        cx, cy = xs // self.cell_size - self.cx0, ys // self.cell_size - self.cy0
+        inside = (cx >= 0) & (cx < ncx) & (cy >= 0) & (cy < ncy)
+        cx[~inside] = 0  # Look anywhere valid; inside masks the answer out
+        cy[~inside] = 0
+        candidates = self.table[cx, cy]  # (N, depth)
+        px, py = xs[:, None], ys[:, None]
+        hit = ((self.x0[candidates] <= px) & (px < self.x1[candidates])
+               & (self.y0[candidates] <= py) & (py < self.y1[candidates]))
+        return inside & hit.any(axis=1)
+
+    def contains_point(self, x, y):
+        """contains() for a single point, without the array overhead"""
+        c = self.cell_size
+        for left, right, top, bottom in self.cells.get((x // c, y // c), ()):
+            if left <= x < right and top <= y < bottom:
+                return True
+        return False
+
+
+# ----------------------------
+# Batched Collisions
+# ----------------------------
+def overlap_pairs(ax, ay, aw, ah, bx, by, bw, bh):
+    """All (i, j) with box a[i] overlapping box b[j], found with a sort-and-sweep on x"""
+    empty = np.empty(0, np.int64)
+    if len(ax) == 0 or len(bx) == 0:
+        return empty, empty
+    order = np.argsort(bx, kind="stable")
+    sorted_bx = bx[order]
+    # Only b boxes starting within max width to the left of a box can reach it
+    lo = np.searchsorted(sorted_bx, ax - int(bw.max()), side="right")
+    hi = np.searchsorted(sorted_bx, ax + aw, side="left")
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return empty, empty
+    i = np.repeat(np.arange(len(ax)), counts)
+    first = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+    j = order[first + np.arange(total)]
+    hit = (bx[j] < ax[i] + aw[i]) & (bx[j] + bw[j] > ax[i]) & (by[j] < ay[i] + ah[i]) & (by[j] + bh[j] > ay[i])
+    return i[hit], j[hit]
+
+
+def resolve_projectile_hits(projectiles, enemies, damage):
+    """Each bullet damages the first live enemy it overlaps and is used up; returns indices of enemies killed
+
+    Gives the same result as checking bullets one by one in spawn order: an enemy only absorbs the
+    bullets it takes to kill it, and later bullets go on to the next enemy they overlap, if any.
+    """
+    n = projectiles.count
+    if not n or not enemies.count:
+        return np.empty(0, np.int64)
+    if n * enemies.count <= SCALAR_PAIRS:
+        return resolve_hits_each(projectiles, enemies, damage)
+    pw = np.full(n, projectiles.w)
+    ph = np.full(n, projectiles.h)
+    pi, ej = overlap_pairs(projectiles.live("x"), projectiles.live("y"), pw, ph,
+                           enemies.live("x"), enemies.live("y"), enemies.live("w"), enemies.live("h"))
+    used = np.zeros(n, bool)
+    health = enemies.live("health")
+    was_alive = health > 0
+    while len(pi):
+        valid = ~used[pi] & (health[ej] > 0)
+        pi, ej = pi[valid], ej[valid]
+        if not len(pi):
+            break
+        # First (lowest index) live enemy for each bullet
+        first = np.full(n, NO_INDEX)
+        np.minimum.at(first, pi, ej)
+        shooters = np.flatnonzero(first != NO_INDEX)
+        targets = first[shooters]
+        # Per enemy, only the earliest bullets needed to kill it count
+        order = np.lexsort((shooters, targets))
+        shooters, targets = shooters[order], targets[order]
+        starts = np.r_[True, targets[1:] != targets[:-1]]
+        rank = np.arange(len(targets)) - np.maximum.accumulate(np.where(starts, np.arange(len(targets)), 0))
+        needed = -(-health[targets] // damage)
+        hits = rank < needed
+        # A bullet passed over here would reach its next enemy only after the bullets before it,
+        # so hits by bullets after the first one passed over wait for the next round
+        passed = shooters[~hits]
+        if len(passed):
+            hits &= shooters < passed.min()
+        used[shooters[hits]] = True
+        np.subtract.at(health, targets[hits], damage)
+        if not len(passed):
+            break
+    projectiles.keep(~used)
+    return np.flatnonzero(was_alive & (health <= 0))
+
+
+def resolve_hits_each(projectiles, enemies, damage):
+    # resolve_projectile_hits() one bullet at a time, for the usual few bullets and enemies
+    pw, ph, m = projectiles.w, projectiles.h, enemies.count
+    ex, ey = enemies.x[:m].tolist(), enemies.y[:m].tolist()
+    boxes = [(j, x, y, x + w, y + h) for j, (x, y, w, h)
+             in enumerate(zip(ex, ey, enemies.w[:m].tolist(), enemies.h[:m].tolist()))]
+    health = enemies.health[:m]
+    was_alive = health > 0
+    hp = None  # Health as a list, made at the first overlap
+    used = []
+    for b, (x, y) in enumerate(zip(projectiles.live("x").tolist(), projectiles.live("y").tolist())):
+        x1, y1 = x + pw, y + ph
+        for j, left, top, right, bottom in boxes:
+            if left < x1 and right > x and top < y1 and bottom > y:
+                if hp is None:
+                    hp = health.tolist()
+                if hp[j] > 0:
+                    hp[j] -= damage
+                    used.append(b)
+                    break
+    if not used:
+        return np.empty(0, np.int64)
+    keep = np.ones(projectiles.count, bool)
+    keep[used] = False
+    projectiles.keep(keep)
+    health[:] = hp
+    return np.flatnonzero(was_alive & (health <= 0))
@@ -0,0 +1,85 @@
+# Import necessary modules
+import struct
+import zlib
+from collections import namedtuple
+
+# ----------------------------
+# Player Input
+# ----------------------------
+# Player input for one simulation step; jump/shoot are key presses, left/right are held keys
+Controls = namedtuple("Controls", ["left", "right", "jump", "shoot"])
+NO_CONTROLS = Controls(False, False, False, False)
+
+# Every possible Controls by its bit pattern (left = bit 0 ... shoot = bit 3)
+ALL_CONTROLS = tuple(Controls(*(bool(bits >> i & 1) for i in range(4))) for bits in range(16))
+
+
+def pack(controls):
+    """One step's controls as a number from 0 to 15"""
+    left, right, jump, shoot = controls
+    return left | right << 1 | jump << 2 | shoot << 3
+
+
+# ----------------------------
+# Recorded Input
+# ----------------------------
+MAGIC = b"AHRI"
+VERSION = 1
+HEADER = struct.Struct("<4sHQ?HH")  # magic, version, seed, endless, setup name length, fingerprint length
+
+
+class ReplayMismatch(Exception):
+    """A replayed game did not end in the state the recording says it should"""
+
+
+class InputRecording:
+    """Everything needed to play a game again exactly: the seed, how it was set up and each step's controls
+
+    Steps are stored one byte each and compressed on save, so a minute of play is a few hundred
+    bytes. fingerprint is GameSim.fingerprint() at the end of the recorded run, if known.
+    """
+
+    def __init__(self, seed, endless=False, setup="", steps=b"", fingerprint=None):
+        self.seed = seed
+        self.endless = endless
+        self.setup = setup  # Name of a scenario set up before the first step ("" for a normal game)
+        self.steps = bytearray(steps)
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return (ALL_CONTROLS[bits] for bits in self.steps)
+
+    def append(self, controls):
+        self.steps.append(pack(controls))
+
+    def save(self, path):
+        setup = self.setup.encode()
+        fingerprint = self.fingerprint or ()
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.endless, len(setup), len(fingerprint)))
+            f.write(setup)
+            f.write(struct.pack(f"<{len(fingerprint)}q", *fingerprint))
+            f.write(zlib.compress(bytes(self.steps), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise IOError(f"Not an input recording: {path}")
+        magic, version, seed, endless, setup_len, n = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise IOError(f"Not an input recording (or from another version): {path}")
+        pos = HEADER.size
+        setup = data[pos:pos + setup_len].decode()
+        pos += setup_len
+        fingerprint = struct.unpack_from(f"<{n}q", data, pos) if n else None
+        pos += 8 * n
+        try:
+            steps = zlib.decompress(data[pos:])
+        except zlib.error as e:
+            raise IOError(f"Corrupt input recording: {path}") from e
+        return cls(seed, endless, setup, steps, fingerprint)
@@ -0,0 +1,232 @@
+# Import necessary modules
+import csv
+import json
+import os
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+# ----------------------------
+# Profiler Settings
+# ----------------------------
+FRAMES = 600  # Frames kept in the ring buffers (10 seconds at 60 FPS)
+MAX_EVENTS = 20000  # Individual phase timings kept for the trace export
+WINDOW = 60  # Frames the overlay averages over
+FRAME_BUDGET_MS = 1000 / 60
+
+
+# ----------------------------
+# Phase Scopes
+# ----------------------------
+class NullScope:
+    """What phase() returns while the profiler is off: entering and leaving it does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SCOPE = NullScope()
+
+
+class Scope:
+    """Times one named phase; reused every time the phase runs, so timing allocates nothing"""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, perf_counter() - self.start)
+        return False
+
+
+# ----------------------------
+# Frame Profiler
+# ----------------------------
+class FrameProfiler:
+    """Per-frame totals of named phases and counts, kept in ring buffers for the last few hundred frames
+
+    Wrap work in `with profiler.phase(name):` and call begin_frame()/end_frame() around each
+    frame. A phase that runs several times in a frame (one per simulation step) is summed; phases
+    may nest. While disabled, phase() hands back a do-nothing scope and the other calls return at
+    once, so the instrumentation can stay in the game loop.
+    """
+
+    def __init__(self, enabled=False, frames=FRAMES, max_events=MAX_EVENTS):
+        self.enabled = enabled
+        self.frames = frames
+        self.frame = 0  # Frames recorded so far; frame % frames is the next ring slot
+        self.frame_start = None
+        self.frame_starts = np.zeros(frames)  # Seconds since origin
+        self.frame_times = np.zeros(frames)  # Seconds
+        self.times = {}  # phase -> ring of per-frame total seconds, in first-seen order
+        self.counts = {}  # name -> ring of per-frame values
+        self.current = {}  # phase -> seconds so far in this frame
+        self.current_counts = {}
+        self.events = deque(maxlen=max_events)  # (phase, start s, duration s)
+        self.scopes = {}  # phase -> its reusable Scope
+        self.origin = perf_counter()
+
+    def phase(self, name):
+        """Context manager timing one phase"""
+        if not self.enabled:
+            return NULL_SCOPE
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def add(self, name, start, duration):
+        self.current[name] = self.current.get(name, 0.0) + duration
+        self.events.append((name, start, duration))
+
+    def count(self, name, value):
+        """Record a number for this frame, e.g. how many enemies there are"""
+        if self.enabled:
+            self.current_counts[name] = value
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = perf_counter()
+            self.current.clear()
+            self.current_counts.clear()
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return  # Off, or switched on halfway through this frame
+        now = perf_counter()
+        slot = self.frame % self.frames
+        self.frame_starts[slot] = self.frame_start - self.origin
+        self.frame_times[slot] = now - self.frame_start
+        for name in self.current:
+            if name not in self.times:
+                self.times[name] = np.zeros(self.frames)
+        for name, ring in self.times.items():
+            ring[slot] = self.current.get(name, 0.0)
+        for name in self.current_counts:
+            if name not in self.counts:
+                self.counts[name] = np.zeros(self.frames)
+        for name, ring in self.counts.items():
+            ring[slot] = self.current_counts.get(name, 0)
+        self.frame += 1
+        self.frame_start = None
+
+    def recent(self, n=None):
+        """Ring slots of the last n recorded frames (all kept frames by default), oldest first"""
+        kept = min(self.frame, self.frames)
+        n = kept if n is None else min(n, kept)
+        return np.arange(self.frame - n, self.frame) % self.frames
+
+    def stats(self, window=WINDOW):
+        """Mean and max in ms of the frame and of each phase over the last window frames, plus latest counts"""
+        slots = self.recent(window)
+        if not len(slots):
+            return {"frame": (0.0, 0.0), "phases": {}, "counts": {}}
+        ms = lambda ring: (float(ring[slots].mean() * 1000), float(ring[slots].max() * 1000))
+        return {
+            "frame": ms(self.frame_times),
+            "phases": {name: ms(ring) for name, ring in self.times.items()},
+            "counts": {name: int(ring[slots[-1]]) for name, ring in self.counts.items()},
+        }
+
+    def clear(self):
+        self.frame = 0
+        self.times.clear()
+        self.counts.clear()
+        self.events.clear()
+
+    def export_csv(self, path):
+        """One row per kept frame: frame number, frame ms, each phase's ms, then the counts"""
+        phases, counts = list(self.times), list(self.counts)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "frame_ms"] + [f"{name}_ms" for name in phases] + counts)
+            first = self.frame - len(self.recent())
+            for i, slot in enumerate(self.recent()):
+                writer.writerow([first + i, round(self.frame_times[slot] * 1000, 4)]
+                                + [round(self.times[name][slot] * 1000, 4) for name in phases]
+                                + [int(self.counts[name][slot]) for name in counts])
+
+    def chrome_trace(self):
+        """Phase timings and counts in the Chrome trace event format (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        trace = [{"name": name, "ph": "X", "pid": pid, "tid": 0,
+                  "ts": (start - self.origin) * 1e6, "dur": duration * 1e6}
+                 for name, start, duration in self.events]
+        for slot in self.recent():
+            ts = self.frame_starts[slot] * 1e6
+            trace.append({"name": "frame", "ph": "X", "pid": pid, "tid": 1, "ts": ts,
+                          "dur": self.frame_times[slot] * 1e6})
+            if self.counts:
+                trace.append({"name": "counts", "ph": "C", "pid": pid, "ts": ts,
+                              "args": {name: int(ring[slot]) for name, ring in self.counts.items()}})
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export_trace(self, path):
+        """Write the Chrome trace JSON to path"""
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+# ----------------------------
+# On-screen Overlay
+# ----------------------------
+class ProfilerOverlay:
+    """Panel of recent phase timings and counts, as (surface, (x, y)) blits to draw over a frame
+
+    The text is rendered again only every refresh_frames frames, so showing it costs little.
+    """
+
+    def __init__(self, profiler, font, pos, color=(255, 255, 255), refresh_frames=15):
+        self.profiler = profiler
+        self.font = font
+        self.pos = pos
+        self.color = color
+        self.refresh_frames = refresh_frames
+        self.built_at = None  # profiler.frame when the panel was last rendered
+        self.blits = []
+
+    def rows(self):
+        # (label, cells) per line; cells are right-aligned in two columns
+        stats = self.profiler.stats()
+        mean, peak = stats["frame"]
+        rows = [(f"ms over the last {WINDOW} frames", ()),
+                (f"frame (budget {FRAME_BUDGET_MS:.1f})", ("avg", "max")),
+                ("  work", (f"{mean:.2f}", f"{peak:.2f}"))]
+        rows += [(f"  {name}", (f"{mean:.2f}", f"{peak:.2f}")) for name, (mean, peak) in stats["phases"].items()]
+        rows += [(name, ("", str(value))) for name, value in stats["counts"].items()]
+        return rows
+
+    def items(self):
+        if self.built_at is None or self.profiler.frame - self.built_at >= self.refresh_frames:
+            rows = [(self.font.render(label, True, self.color), [self.font.render(c, True, self.color) for c in cells])
+                    for label, cells in self.rows()]
+            height = self.font.get_linesize()
+            column = max(c.get_width() for _, cells in rows for c in cells) + 12
+            width = max(label.get_width() + (2 * column if cells else 0) for label, cells in rows) + 12
+            panel = pygame.Surface((width, height * len(rows) + 8), pygame.SRCALPHA)
+            panel.fill((0, 0, 0, 170))  # See-through background, solid text
+            for i, (label, cells) in enumerate(rows):
+                y = 4 + height * i
+                panel.blit(label, (6, y))
+                for j, cell in enumerate(cells):
+                    panel.blit(cell, (width - 6 - (len(cells) - 1 - j) * column - cell.get_width(), y))
+            self.blits = [(panel, self.pos)]
+            self.built_at = self.profiler.frame
+        return self.blits
+
+
+# Shared by the game loop and the simulation; GAME_PROFILE=1 turns recording on from the start
+profiler = FrameProfiler(enabled=os.environ.get("GAME_PROFILE", "0") == "1")
@@ -0,0 +1,172 @@
+# Import necessary modules
+from collections import OrderedDict
+
+import pygame
+
+# ----------------------------
+# Chunk Cache Settings
+# ----------------------------
+MAX_CHUNKS = 8  # Pre-rendered chunks kept in memory (about 1.8 MB each at 900x500)
+
+
+# ----------------------------
+# Shared Sprite Surfaces
+# ----------------------------
+class SurfaceCache:
+    """One filled surface per (size, color), shared by every entity that looks the same
+
+    Surfaces made before the window exists are converted to the display's pixel format the first
+    time they are asked for afterwards, so blitting them never needs a format conversion.
+    """
+
+    def __init__(self):
+        self.surfaces = {}  # (size, color) -> (Surface, converted)
+
+    def get(self, size, color):
+        key = (size, color)
+        entry = self.surfaces.get(key)
+        if entry is not None and entry[1]:
+            return entry[0]
+        surface = entry[0] if entry is not None else None
+        if surface is None:
+            surface = pygame.Surface(size)
+            surface.fill(color)
+        converted = pygame.display.get_surface() is not None
+        if converted:
+            surface = surface.convert()
+        self.surfaces[key] = (surface, converted)
+        return surface
+
+
+# ----------------------------
+# Pre-rendered Static Level Chunks
+# ----------------------------
+class StaticChunks:
+    """Background and static sprites pre-rendered into screen-wide chunk surfaces
+
+    sprites must be a SpatialGroup (so a chunk only looks at the sprites it overlaps) and must not
+    move; call invalidate() for a span where sprites were added or removed, and build a new
+    StaticChunks when the level changes.
+    """
+
+    def __init__(self, sprites, chunk_width, chunk_height, background, max_chunks=MAX_CHUNKS):
+        self.sprites = sprites
+        self.chunk_width = chunk_width
+        self.chunk_height = chunk_height
+        self.background = background
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()  # chunk index -> Surface, least recently drawn first
+        self.version = 0  # Bumped whenever a rendered chunk is thrown away
+
+    def chunk(self, index):
+        """Return the surface of one chunk, rendering it the first time it is needed"""
+        surface = self.chunks.get(index)
+        if surface is not None:
+            self.chunks.move_to_end(index)
+            return surface
+        x0 = index * self.chunk_width
+        surface = pygame.Surface((self.chunk_width, self.chunk_height))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()  # Same pixel format as the screen, so blits are plain copies
+        surface.fill(self.background)
+        for sprite in self.sprites.hits(pygame.Rect(x0, 0, self.chunk_width, self.chunk_height)):
+            surface.blit(sprite.image, sprite.rect.move(-x0, 0))
+        self.chunks[index] = surface
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return surface
+
+    def invalidate(self, x0, x1):
+        """Forget the rendered chunks overlapping level x range [x0, x1), so they are rendered again"""
+        stale = [index for index in self.chunks
+                 if index * self.chunk_width < x1 and (index + 1) * self.chunk_width > x0]
+        for index in stale:
+            del self.chunks[index]
+        if stale:
+            self.version += 1
+
+    def draw(self, screen, offset_x):
+        """Blit the one or two chunks visible with the camera at offset_x"""
+        self.restore(screen, offset_x, screen.get_rect())
+
+    def restore(self, screen, offset_x, rect):
+        """Paint the static background back over one screen rectangle"""
+        rect = rect.clip(screen.get_rect())
+        first = (offset_x + rect.left) // self.chunk_width
+        last = (offset_x + rect.right - 1) // self.chunk_width
+        for index in range(first, last + 1):
+            x = index * self.chunk_width - offset_x  # Chunk's left edge on screen
+            area = rect.clip(pygame.Rect(x, 0, self.chunk_width, self.chunk_height))
+            screen.blit(self.chunk(index), area.topleft, area.move(-x, 0))
+
+
+# ----------------------------
+# Cached Text
+# ----------------------------
+class TextCache:
+    """Rendered text surfaces, so HUD text is only re-rendered when its value changes"""
+
+    def __init__(self, color, max_entries=32):
+        self.color = color
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()  # text -> Surface, least recently used first
+
+    def get(self, font, text):
+        surface = self.surfaces.get(text)
+        if surface is not None:
+            self.surfaces.move_to_end(text)
+            return surface
+        surface = font.render(text, True, self.color)
+        self.surfaces[text] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+# ----------------------------
+# Dirty Rectangle Presenting
+# ----------------------------
+class DirtyRectRenderer:
+    """Redraws and presents only the screen areas whose sprites changed since the last frame
+
+    A frame is the static background (StaticChunks at a scroll offset) plus a back-to-front list
+    of (surface, (x, y)) blits. When the camera scrolls (or the background changes) every pixel
+    may change, so that frame is drawn and presented in full.
+    """
+
+    def __init__(self, max_rects=64):
+        self.max_rects = max_rects  # Beyond this many changed areas a full redraw is cheaper
+        self.invalidate()
+
+    def invalidate(self):
+        """Force the next frame to be drawn in full (e.g. after something else drew on the screen)"""
+        self.chunks = None
+        self.version = None
+        self.offset_x = None
+        self.items = []
+
+    def present(self, screen, chunks, offset_x, items):
+        if chunks is not self.chunks or chunks.version != self.version or offset_x != self.offset_x:
+            chunks.draw(screen, offset_x)
+            screen.blits(items, doreturn=False)
+            pygame.display.flip()
+        else:
+            changed = set(self.items).symmetric_difference(items)
+            if len(changed) > self.max_rects:
+                chunks.draw(screen, offset_x)
+                screen.blits(items, doreturn=False)
+                pygame.display.flip()
+            elif changed:
+                dirty = [pygame.Rect(pos, surface.get_size()) for surface, pos in changed]
+                for rect in dirty:
+                    # Rebuild this area from the background up, so overlapping sprites stay in order
+                    screen.set_clip(rect)
+                    chunks.restore(screen, offset_x, rect)
+                    screen.blits([item for item in items if rect.colliderect(pygame.Rect(item[1], item[0].get_size()))],
+                                 doreturn=False)
+                screen.set_clip(None)
+                pygame.display.update(dirty)
+        self.chunks = chunks
+        self.version = chunks.version
+        self.offset_x = offset_x
+        self.items = items
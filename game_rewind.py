@@ -0,0 +1,181 @@
+# Import necessary modules
+import struct
+import sys
+import zlib
+from collections import deque
+
+import numpy as np
+
+# ----------------------------
+# Rewind Settings
+# ----------------------------
+REWIND_STEPS = 5 * 60 * 60  # States kept: five minutes of simulation steps at 60 per second
+KEYFRAME_EVERY = 60  # Every this many states one is stored whole, bounding the work of a restore
+COMPRESSION = 1  # zlib level: the deltas are mostly zero bytes, so the fastest level does well
+
+
+# ----------------------------
+# Delta-encoded State History
+# ----------------------------
+class RewindBuffer:
+    """The last few minutes of game states, for rewinding and instant retries
+
+    A state is a tuple of byte strings (sections), as made by GameSim.snapshot(). Keyframes store
+    every section compressed; the states between them store per section nothing when it did not
+    change, its XOR with the previous state when its length stayed the same (mostly zero bytes, so
+    it compresses to almost nothing), or else the new bytes. Each encoded state is packed into a
+    single bytes object, as per-section tuples and bytes would cost more than the deltas themselves.
+    The oldest states are dropped a keyframe's worth at a time.
+    """
+
+    def __init__(self, capacity=REWIND_STEPS, keyframe_every=KEYFRAME_EVERY):
+        self.capacity = capacity
+        self.keyframe_every = keyframe_every
+        self.groups = deque()  # Lists of packed encoded states, each starting with a keyframe
+        self.count = 0
+        self.last = None  # Sections of the newest state
+        self.full = {}  # Section number -> (bytes, compressed) last stored whole, shared while unchanged
+
+    def __len__(self):
+        return self.count
+
+    def push(self, sections):
+        """Add the newest state"""
+        if self.last is None or len(self.groups[-1]) >= self.keyframe_every:
+            self.groups.append([pack(self.whole(i, data) for i, data in enumerate(sections))])
+        else:
+            self.groups[-1].append(pack(delta(old, new) for old, new in zip(self.last, sections)))
+        self.last = sections
+        self.count += 1
+        while self.count > self.capacity and len(self.groups) > 1:
+            self.count -= len(self.groups.popleft())
+
+    def whole(self, i, data):
+        # A section stored whole; a keyframe reuses the last compression if nothing changed
+        cached = self.full.get(i)
+        if cached is not None and cached[0] == data:
+            return ("full", cached[1])
+        compressed = zlib.compress(data, COMPRESSION)
+        self.full[i] = data, compressed
+        return ("full", compressed)
+
+    def locate(self, back):
+        # (group, position in it) of the state `back` states before the newest
+        if not 0 <= back < self.count:
+            raise IndexError(f"Only {self.count} states to go back through")
+        position = self.count - 1 - back
+        for group in self.groups:
+            if position < len(group):
+                return group, position
+            position -= len(group)
+
+    def state(self, back=0):
+        """Sections of the state `back` states before the newest (0 = newest)"""
+        group, position = self.locate(back)
+        sections = None
+        for entry in group[:position + 1]:
+            sections = apply(sections, entry)
+        return sections
+
+    def rewind(self, back):
+        """Go back `back` states (as far as the buffer reaches): forget the newer ones and return the state"""
+        back = min(back, self.count - 1)
+        group, position = self.locate(back)
+        sections = self.state(back)
+        while self.groups[-1] is not group:
+            self.count -= len(self.groups.pop())
+        self.count -= len(group) - position - 1
+        del group[position + 1:]
+        self.last = sections
+        return sections
+
+    def clear(self):
+        self.groups.clear()
+        self.count = 0
+        self.last = None
+        self.full.clear()
+
+    def nbytes(self):
+        """Memory the stored states take, Python object overhead included"""
+        return sum(sys.getsizeof(group) + sum(map(sys.getsizeof, group)) for group in self.groups)
+
+
+def delta(old, new):
+    # One section of a state between keyframes
+    if new is old or new == old:
+        return None
+    if len(new) == len(old):
+        xor = np.bitwise_xor(np.frombuffer(old, np.uint8), np.frombuffer(new, np.uint8))
+        return ("xor", zlib.compress(xor.tobytes(), COMPRESSION))
+    return ("full", zlib.compress(new, COMPRESSION))
+
+
+PART = struct.Struct("<BI")  # Kind (0 = unchanged, 1 = whole, 2 = XOR) and payload length
+KINDS = {"full": 1, "xor": 2}
+
+
+def pack(parts):
+    # One encoded state as a single bytes object
+    out = []
+    for part in parts:
+        if part is None:
+            out.append(PART.pack(0, 0))
+        else:
+            out += (PART.pack(KINDS[part[0]], len(part[1])), part[1])
+    return b"".join(out)
+
+
+def apply(sections, entry):
+    # The state after sections that a packed entry describes
+    result, pos, view = [], 0, memoryview(entry)
+    while pos < len(entry):
+        kind, length = PART.unpack_from(entry, pos)
+        pos += PART.size
+        payload = view[pos:pos + length]
+        pos += length
+        if kind == 0:
+            result.append(sections[len(result)])
+        elif kind == 1:
+            result.append(zlib.decompress(payload))
+        else:
+            xor = np.frombuffer(zlib.decompress(payload), np.uint8)
+            result.append(np.bitwise_xor(np.frombuffer(sections[len(result)], np.uint8), xor).tobytes())
+    return tuple(result)
+
+
+# ----------------------------
+# Saved Games
+# ----------------------------
+MAGIC = b"AHGS"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")  # magic, version, number of sections
+
+
+def save_state(path, sections):
+    """Write one state (GameSim.snapshot()) to a file"""
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(sections)))
+        for data in sections:
+            packed = zlib.compress(data, COMPRESSION)
+            f.write(struct.pack("<I", len(packed)))
+            f.write(packed)
+
+
+def load_state(path):
+    """Read a state written by save_state(), for GameSim.restore()"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise IOError(f"Not a saved game: {path}")
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise IOError(f"Not a saved game (or from another version): {path}")
+    sections, pos = [], HEADER.size
+    try:
+        for _ in range(count):
+            (size,) = struct.unpack_from("<I", data, pos)
+            sections.append(zlib.decompress(data[pos + 4:pos + 4 + size]))
+            pos += 4 + size
+    except (struct.error, zlib.error) as e:
+        raise IOError(f"Corrupt saved game: {path}") from e
+    return tuple(sections)
@@ -0,0 +1,104 @@
+# Import necessary modules
+from collections import defaultdict
+from itertools import count
+
+import pygame
+
+# ----------------------------
+# Spatial Hash Settings
+# ----------------------------
+CELL_SIZE = 128  # Grid cell size in pixels, about two to three sprites wide
+
+
+# ----------------------------
+# Spatial Hash
+# ----------------------------
+class SpatialHash:
+    """Uniform grid that maps cells to the sprites overlapping them (anything with a .rect)"""
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)  # (cx, cy) -> sprites touching that cell
+        self.spans = {}  # sprite -> (cx0, cy0, cx1, cy1) cells it is registered in
+        self.order = {}  # sprite -> insertion number, keeps query results in a stable order
+        self.counter = count()
+
+    def span(self, rect):
+        """Range of cells covered by rect"""
+        c = self.cell_size
+        x, y, w, h = rect
+        return x // c, y // c, (x + w - 1 if w else x) // c, (y + h - 1 if h else y) // c
+
+    def insert(self, sprite):
+        self.order[sprite] = next(self.counter)
+        self.add_cells(sprite, self.span(sprite.rect))
+
+    def remove(self, sprite):
+        span = self.spans.pop(sprite, None)
+        if span is not None:
+            self.remove_cells(sprite, span)
+            del self.order[sprite]
+
+    def add_cells(self, sprite, span):
+        self.spans[sprite] = span
+        cx0, cy0, cx1, cy1 = span
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells[(cx, cy)].add(sprite)
+
+    def remove_cells(self, sprite, span):
+        cx0, cy0, cx1, cy1 = span
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(sprite)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def candidates(self, rect):
+        """Sprites in the cells rect covers; they may not actually overlap it"""
+        cx0, cy0, cx1, cy1 = self.span(rect)
+        if cx0 == cx1 and cy0 == cy1:
+            return self.cells.get((cx0, cy0), ())  # Small rects usually sit in a single cell
+        found = set()
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    found |= cell
+        return found
+
+    def query(self, rect):
+        """Sprites whose rects overlap rect, oldest first"""
+        hits = [s for s in self.candidates(rect) if s.rect.colliderect(rect)]
+        if len(hits) > 1:
+            hits.sort(key=self.order.__getitem__)
+        return hits
+
+
+# ----------------------------
+# Sprite Group Backed by a Spatial Hash
+# ----------------------------
+class SpatialGroup(pygame.sprite.Group):
+    """Sprite group that keeps a spatial hash of its members for collision queries
+
+    Sprites are indexed when added and dropped when removed or killed. Members are not expected
+    to move (platforms, items); moving entities live in the game_entities stores.
+    """
+
+    def __init__(self, *sprites, cell_size=CELL_SIZE):
+        self.grid = SpatialHash(cell_size)
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        if sprite not in self.spritedict:
+            self.grid.insert(sprite)
+        super().add_internal(sprite, layer)
+
+    def remove_internal(self, sprite):
+        self.grid.remove(sprite)
+        super().remove_internal(sprite)
+
+    def hits(self, rect):
+        """Members overlapping rect, in the order they were added"""
+        return self.grid.query(rect)
@@ -0,0 +1,434 @@
+# Importing necessary libraries
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2  # OpenCV for image processing
+import numpy as np
+from PIL import Image  # Only used to read image headers without decoding
+
+Image.MAX_IMAGE_PIXELS = None  # Huge scans are expected here, not decompression bombs
+
+# ----------------------------
+# Crop and Scale Transforms (no GUI code here)
+# ----------------------------
+CANVAS_SIZE = 600  # Size of the editor's main canvas
+MIN_CROP = 5  # Smallest crop (in image pixels) that is accepted
+
+
+def fit_size(w, h, box_w, box_h):
+    """Return the size of a w x h image scaled to fit inside box_w x box_h"""
+    scale = min(box_w / w, box_h / h)
+    return int(w * scale), int(h * scale)
+
+
+# ----------------------------
+# Viewport (zoom and pan on a canvas)
+# ----------------------------
+# Image point (x, y) sits at the canvas top-left; zoom is canvas pixels per image pixel
+Viewport = namedtuple("Viewport", ["x", "y", "zoom", "width", "height"])
+MAX_ZOOM = 32
+
+
+def fit_viewport(shape, canvas_w=CANVAS_SIZE, canvas_h=CANVAS_SIZE):
+    """Viewport showing the whole image centered on the canvas"""
+    h, w = shape[:2]
+    zoom = min(canvas_w / w, canvas_h / h)
+    return Viewport((w - canvas_w / zoom) / 2, (h - canvas_h / zoom) / 2, zoom, canvas_w, canvas_h)
+
+
+def clamp_viewport(view, shape):
+    """Center the image along axes where it is smaller than the canvas, else allow no empty margin"""
+    h, w = shape[:2]
+    span_w, span_h = view.width / view.zoom, view.height / view.zoom
+    x = (w - span_w) / 2 if span_w >= w else min(max(view.x, 0), w - span_w)
+    y = (h - span_h) / 2 if span_h >= h else min(max(view.y, 0), h - span_h)
+    return view._replace(x=x, y=y)
+
+
+def zoom_viewport(view, shape, factor, cx, cy):
+    """Zoom by factor while keeping the image pixel under canvas point (cx, cy) in place"""
+    fit = fit_viewport(shape, view.width, view.height)
+    zoom = min(max(view.zoom * factor, fit.zoom), MAX_ZOOM)
+    if zoom <= fit.zoom:
+        return fit
+    ix, iy = view.x + cx / view.zoom, view.y + cy / view.zoom
+    return clamp_viewport(view._replace(x=ix - cx / zoom, y=iy - cy / zoom, zoom=zoom), shape)
+
+
+def pan_viewport(view, shape, dx, dy):
+    """Move the view by (dx, dy) canvas pixels"""
+    return clamp_viewport(view._replace(x=view.x - dx / view.zoom, y=view.y - dy / view.zoom), shape)
+
+
+def visible_region(shape, view):
+    """Return the canvas box (x0, y0, x1, y1) covered by the image, or None if nothing is visible"""
+    h, w = shape[:2]
+    cx0 = int(round(max(0.0, -view.x * view.zoom)))
+    cy0 = int(round(max(0.0, -view.y * view.zoom)))
+    cx1 = int(round(min(view.width, (w - view.x) * view.zoom)))
+    cy1 = int(round(min(view.height, (h - view.y) * view.zoom)))
+    if cx1 <= cx0 or cy1 <= cy0:
+        return None
+    return cx0, cy0, cx1, cy1
+
+
+def canvas_to_image_coords(x, y, shape, view):
+    """Convert canvas coordinates to image coordinates"""
+    img_x = int(np.floor(view.x + x / view.zoom))
+    img_y = int(np.floor(view.y + y / view.zoom))
+    img_x = int(np.clip(img_x, 0, shape[1] - 1))
+    img_y = int(np.clip(img_y, 0, shape[0] - 1))
+    return img_x, img_y
+
+
+def image_to_canvas_coords(x, y, view):
+    """Convert image coordinates to (possibly off-screen) canvas coordinates"""
+    return (x - view.x) * view.zoom, (y - view.y) * view.zoom
+
+
+def crop_box_from_canvas(start, end, shape, view):
+    """Turn a dragged canvas rectangle into an (x0, y0, x1, y1) image box, or None if too small"""
+    x0, y0 = canvas_to_image_coords(start[0], start[1], shape, view)
+    x1, y1 = canvas_to_image_coords(end[0], end[1], shape, view)
+    x0, x1 = sorted([max(0, x0), max(0, x1)])
+    y0, y1 = sorted([max(0, y0), max(0, y1)])
+    if x1 - x0 < MIN_CROP or y1 - y0 < MIN_CROP:
+        return None
+    return x0, y0, x1, y1
+
+
+def render_viewport(image, view, pyramid=None, interpolation=None):
+    """Resample only the visible part of an image; returns (pixels, canvas x, canvas y) or None"""
+    box = visible_region(image.shape, view)
+    if box is None:
+        return None
+    cx0, cy0, cx1, cy1 = box
+    pipeline = TransformPipeline(image.shape).view(view.x + cx0 / view.zoom, view.y + cy0 / view.zoom,
+                                                   view.zoom, (cx1 - cx0, cy1 - cy0))
+    return pipeline.render(image, pyramid=pyramid, interpolation=interpolation), cx0, cy0
+
+
+def crop(image, box):
+    """Return the region of an image inside box (a view, no pixels are copied)"""
+    if box is None:
+        return image
+    x0, y0, x1, y1 = box
+    return image[y0:y1, x0:x1]
+
+
+def scaled_size(w, h, scale):
+    """Return the output size of a w x h image resized by scale"""
+    return max(1, int(w * scale)), max(1, int(h * scale))
+
+
+def apply_recipe(image, box, scale):
+    """Crop then scale an image exactly like the editor's Save button"""
+    return TransformPipeline(image.shape).crop(box).scale(scale).render(image)
+
+
+def pick_interpolation(src_w, src_h, dst_w, dst_h):
+    """Choose an interpolation that suits the direction of a resize"""
+    if dst_w < src_w and dst_h < src_h:
+        return cv2.INTER_AREA  # Averages pixels, no aliasing when shrinking
+    if dst_w > src_w or dst_h > src_h:
+        return cv2.INTER_CUBIC  # Smoother than linear when enlarging
+    return cv2.INTER_LINEAR
+
+
+# ----------------------------
+# Image Pyramid (cached downsampled levels)
+# ----------------------------
+class ImagePyramid:
+    """Mipmap of an image where each level is half the size of the one before, built on demand"""
+
+    def __init__(self, image, min_side=32):
+        self.source = image
+        self.levels = [image]  # Level 0 is the source itself, never copied
+        self.min_side = min_side
+        self.lock = threading.Lock()  # Levels may be built from a render thread
+
+    def level(self, index):
+        """Return pyramid level index, building any missing levels from the one above"""
+        with self.lock:
+            while len(self.levels) <= index:
+                prev = self.levels[-1]
+                if min(prev.shape[:2]) < self.min_side * 2:
+                    break
+                self.levels.append(cv2.pyrDown(prev))
+            return self.levels[min(index, len(self.levels) - 1)]
+
+    def level_for(self, w, h):
+        """Return the smallest level that is still at least w x h"""
+        index = 0
+        while True:
+            nxt = self.level(index + 1)
+            if nxt is self.levels[index] or nxt.shape[1] < w or nxt.shape[0] < h:
+                return self.levels[index]
+            index += 1
+
+    def resize(self, w, h):
+        """Resize to w x h starting from the nearest level, so cost does not depend on source size"""
+        src = self.level_for(w, h)
+        src_h, src_w = src.shape[:2]
+        if (src_w, src_h) == (w, h):
+            return src
+        return cv2.resize(src, (w, h), interpolation=pick_interpolation(src_w, src_h, w, h))
+
+
+# ----------------------------
+# Lazy Transform Pipeline
+# ----------------------------
+def affine(a, b, c, d, e, f):
+    """3x3 matrix of the affine map (u, v) -> (a*u + b*v + c, d*u + e*v + f)"""
+    return np.array([[a, b, c], [d, e, f], [0.0, 0.0, 1.0]])
+
+
+class TransformPipeline:
+    """Crop/scale/flip/rotate edits kept as one affine map; nothing is computed until render()
+
+    The matrix works in pixel-edge coordinates (pixel x spans [x, x+1]) and maps
+    source positions to output positions.
+    """
+
+    def __init__(self, shape):
+        h, w = shape[:2]
+        self.source_size = (w, h)
+        self.size = (w, h)  # Output size after all edits
+        self.matrix = np.eye(3)
+        self.ops = ()  # Edits applied so far, e.g. (("crop", box), ("scale", 0.5))
+
+    def then(self, matrix, size, op):
+        """Return a new pipeline with one more edit; pipelines are never modified in place"""
+        nxt = TransformPipeline.__new__(TransformPipeline)
+        nxt.source_size = self.source_size
+        nxt.size = size
+        nxt.matrix = matrix @ self.matrix
+        nxt.ops = self.ops + (op,)
+        return nxt
+
+    def crop(self, box):
+        """Keep the part inside box, clipped to the image like slicing would; an empty box is an error"""
+        if box is None:
+            return self
+        w, h = self.size
+        x0, x1 = (min(max(int(v), 0), w) for v in (box[0], box[2]))
+        y0, y1 = (min(max(int(v), 0), h) for v in (box[1], box[3]))
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"Crop box {tuple(box)} is empty or outside the {w}x{h} image")
+        box = (x0, y0, x1, y1)
+        return self.then(affine(1, 0, -x0, 0, 1, -y0), (x1 - x0, y1 - y0), ("crop", box))
+
+    def scale(self, factor):
+        w, h = self.size
+        new_w, new_h = scaled_size(w, h, factor)
+        return self.then(affine(new_w / w, 0, 0, 0, new_h / h, 0), (new_w, new_h), ("scale", factor))
+
+    def view(self, x, y, zoom, size):
+        """Magnify by zoom around image point (x, y), which becomes the output's top-left corner"""
+        return self.then(affine(zoom, 0, -x * zoom, 0, zoom, -y * zoom), size, ("view", (x, y, zoom)))
+
+    def flip(self, horizontal=True):
+        w, h = self.size
+        m = affine(-1, 0, w, 0, 1, 0) if horizontal else affine(1, 0, 0, 0, -1, h)
+        return self.then(m, self.size, ("flip", horizontal))
+
+    def rotate90(self, clockwise=True):
+        w, h = self.size
+        m = affine(0, -1, h, 1, 0, 0) if clockwise else affine(0, 1, 0, -1, 0, w)
+        return self.then(m, (h, w), ("rotate90", clockwise))
+
+    def render(self, image, size=None, pyramid=None, pyramid_box=None, interpolation=None, level_bias=0):
+        """Evaluate the edits on image in a single resample
+
+        size stretches the output to another size (used for previews). pyramid lets the
+        render read from the coarsest level that still has enough detail; its level 0
+        must cover pyramid_box of the source (default: all of it). level_bias picks
+        that many levels coarser still, for fast drafts.
+        """
+        out_w, out_h = size or self.size
+        m = affine(out_w / self.size[0], 0, 0, 0, out_h / self.size[1], 0) @ self.matrix
+        src = image
+        if pyramid is not None:
+            bx0, by0, bx1, by1 = pyramid_box or (0, 0) + self.source_size
+            need = max(np.hypot(m[0, 0], m[1, 0]), np.hypot(m[0, 1], m[1, 1]))  # Output px per source px
+            index, src = 0, pyramid.level(0)
+            while True:
+                nxt = pyramid.level(index + 1)
+                if nxt is src or nxt.shape[1] / (bx1 - bx0) < need:
+                    break
+                index, src = index + 1, nxt
+            for _ in range(level_bias):
+                index, src = index + 1, pyramid.level(index + 1)
+            fx, fy = src.shape[1] / (bx1 - bx0), src.shape[0] / (by1 - by0)
+            m = m @ np.linalg.inv(affine(fx, 0, -bx0 * fx, 0, fy, -by0 * fy))
+        # Read only the part of the source that lands inside the output
+        inv = np.linalg.inv(m)
+        corners = inv @ np.array([[0, out_w, 0, out_w], [0, 0, out_h, out_h], [1, 1, 1, 1]], dtype=float)
+        src_h, src_w = src.shape[:2]
+        rx0 = int(np.clip(np.floor(corners[0].min() + 1e-6), 0, src_w - 1))
+        ry0 = int(np.clip(np.floor(corners[1].min() + 1e-6), 0, src_h - 1))
+        rx1 = int(np.clip(np.ceil(corners[0].max() - 1e-6), rx0 + 1, src_w))
+        ry1 = int(np.clip(np.ceil(corners[1].max() - 1e-6), ry0 + 1, src_h))
+        m = m @ affine(1, 0, rx0, 0, 1, ry0)
+        rw, rh = rx1 - rx0, ry1 - ry0
+        if (m[0, 1] == 0 and m[1, 0] == 0 and abs(m[0, 2]) < 0.5 and abs(m[1, 2]) < 0.5
+                and abs(m[0, 0] * rw - out_w) < 0.5 and abs(m[1, 1] * rh - out_h) < 0.5):
+            if (rw, rh) == (out_w, out_h) and hasattr(src, "read_region"):
+                # Full resolution crop of a memory-mapped TiledImage: copy it band by band,
+                # releasing each, instead of keeping the whole mapped region resident
+                return src.read_region((rx0, ry0, rx1, ry1))
+            # Plain crop+scale (to within half an output pixel): a single resize of the region,
+            # identical to slicing then resizing
+            return cv2.resize(src[ry0:ry1, rx0:rx1], (out_w, out_h),
+                              interpolation=interpolation or pick_interpolation(rw, rh, out_w, out_h))
+        region = src[ry0:ry1, rx0:rx1]
+        # Flips, rotations and sub-pixel views: one warp, in OpenCV's pixel-center coordinates
+        center = affine(1, 0, -0.5, 0, 1, -0.5) @ m @ affine(1, 0, 0.5, 0, 1, 0.5)
+        return cv2.warpAffine(np.ascontiguousarray(region), center[:2], (out_w, out_h),
+                              flags=interpolation or cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def render_fitted(pipeline, image, box_w, box_h, pyramid=None, pyramid_box=None, fast=False):
+    """Preview of a pipeline's output fitted inside box_w x box_h
+
+    When the output is smaller than the box it is rendered at its real size and then
+    enlarged, so the preview shows the detail the export will actually have.
+    fast trades quality for speed: nearest-neighbour from one level coarser.
+    """
+    out_w, out_h = pipeline.size
+    disp_w, disp_h = fit_size(out_w, out_h, box_w, box_h)
+    interpolation = cv2.INTER_NEAREST if fast else None
+    bias = 1 if fast else 0
+    if out_w >= disp_w:
+        return pipeline.render(image, (disp_w, disp_h), pyramid, pyramid_box, interpolation, bias)
+    small = pipeline.render(image, None, pyramid, pyramid_box, interpolation, bias)
+    return cv2.resize(small, (disp_w, disp_h),
+                      interpolation=interpolation or pick_interpolation(out_w, out_h, disp_w, disp_h))
+
+
+# JPEG decoders can skip most of the work when asked for 1/2, 1/4 or 1/8 of the size
+REDUCED_MODES = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def load_rgb_reduced(path, min_side=CANVAS_SIZE):
+    """Quickly decode a JPEG at reduced size, keeping at least min_side pixels; None if that won't help"""
+    try:
+        with Image.open(path) as im:
+            if im.format != "JPEG":
+                return None  # Other formats decode at full size anyway
+            w, h = im.size
+    except Exception:
+        return None
+    for factor, mode in REDUCED_MODES:
+        if max(w, h) // factor >= min_side:
+            img = cv2.imread(path, mode)
+            return None if img is None else cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return None
+
+
+def load_rgb(path):
+    """Read an image file as an RGB array"""
+    img = cv2.imread(path)
+    if img is None:
+        raise IOError(f"Could not read image: {path}")
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def save_rgb(path, img, progress=None):
+    """Write an RGB array to an image file, calling progress(fraction) while writing if given"""
+    if progress is None:
+        if not cv2.imwrite(path, cv2.cvtColor(img, cv2.COLOR_RGB2BGR)):
+            raise IOError(f"Could not write image: {path}")
+        return
+    ok, encoded = cv2.imencode(os.path.splitext(path)[1] or ".png", cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+    if not ok:
+        raise IOError(f"Could not encode image: {path}")
+    data = encoded.tobytes()
+    chunk = 1024 * 1024
+    try:
+        with open(path, "wb") as f:
+            for pos in range(0, len(data), chunk):
+                progress(pos / len(data))  # May raise to abort the write
+                f.write(data[pos:pos + chunk])
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)  # Don't leave a truncated file behind
+        raise
+    progress(1.0)
+
+
+# ----------------------------
+# Batch Processing
+# ----------------------------
+# One line of a manifest: input file, crop box (or None for the whole image), scale, output file
+CropJob = namedtuple("CropJob", ["input", "box", "scale", "output"])
+# Outcome of one job; error is None on success
+JobResult = namedtuple("JobResult", ["job", "size", "seconds", "error"])
+
+
+def read_manifest(path):
+    """Read a CSV manifest with columns input,x0,y0,x1,y1,scale,output"""
+    jobs = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            coords = [row.get(k, "").strip() for k in ("x0", "y0", "x1", "y1")]
+            box = tuple(int(c) for c in coords) if all(coords) else None
+            scale = float(row.get("scale") or 1.0)
+            jobs.append(CropJob(row["input"], box, scale, row["output"]))
+    return jobs
+
+
+def process_job(job):
+    """Load, crop, scale and save one image; runs inside a worker process"""
+    start = time.perf_counter()
+    try:
+        out = apply_recipe(load_rgb(job.input), job.box, job.scale)
+        out_dir = os.path.dirname(job.output)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        save_rgb(job.output, out)
+        size, error = (out.shape[1], out.shape[0]), None
+    except Exception as e:
+        size, error = None, str(e)
+    return JobResult(job, size, time.perf_counter() - start, error)
+
+
+def run_batch(jobs, workers=None):
+    """Run jobs across a process pool and yield each JobResult as soon as it finishes"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch crop and resize images from a CSV manifest")
+    parser.add_argument("manifest", help="CSV file with columns input,x0,y0,x1,y1,scale,output")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Number of worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    jobs = read_manifest(args.manifest)
+    start = time.perf_counter()
+    done = failed = 0
+    for result in run_batch(jobs, args.workers):
+        if result.error:
+            failed += 1
+            print(f"FAIL {result.job.input}: {result.error}", file=sys.stderr)
+        else:
+            done += 1
+            print(f"ok   {result.job.output} {result.size[0]}x{result.size[1]} ({result.seconds * 1000:.0f} ms)")
+    elapsed = time.perf_counter() - start
+    rate = (done + failed) / elapsed if elapsed > 0 else 0.0
+    print(f"{done} saved, {failed} failed in {elapsed:.2f} s ({rate:.1f} images/s)")
+    return 1 if failed else 0
+
+
+# Run from the command line
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# Importing necessary libraries
+import os
+from collections import OrderedDict
+
+import tiled_image
+
+# File types a folder session steps through
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".npy", ".raw")
+
+
+def image_bytes(image, pyramid):
+    """Approximate RAM held by a decoded image and its display pyramid"""
+    if isinstance(image, tiled_image.TiledImage):
+        total = 0  # Pixels live in the memory map, only the overview levels are in RAM
+        levels = pyramid.levels
+    else:
+        total = image.nbytes
+        levels = pyramid.levels[1:]  # Level 0 is the image itself
+    return total + sum(level.nbytes for level in levels)
+
+
+# ----------------------------
+# Decoded Image Cache
+# ----------------------------
+class DecodedImageCache:
+    """LRU cache of decoded images and their pyramids, capped by memory"""
+
+    def __init__(self, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # path -> (image, pyramid, nbytes), oldest first
+        self.used_bytes = 0
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def get(self, path):
+        """Return (image, pyramid) for path and mark it recently used, or None"""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        self.entries.move_to_end(path)
+        return entry[0], entry[1]
+
+    def put(self, path, image, pyramid):
+        """Add a decoded image, evicting the least recently used ones to stay under budget"""
+        self.discard(path)
+        nbytes = image_bytes(image, pyramid)
+        self.entries[path] = (image, pyramid, nbytes)
+        self.used_bytes += nbytes
+        while self.used_bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, _, old_bytes) = self.entries.popitem(last=False)
+            self.used_bytes -= old_bytes
+
+    def discard(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.used_bytes -= entry[2]
+
+
+# ----------------------------
+# Folder Session
+# ----------------------------
+class ImageSession:
+    """The images of one folder, the current position, and each image's saved edits"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.files = sorted(
+            os.path.join(folder, name) for name in os.listdir(folder)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.index = 0
+        self.states = {}  # path -> (EditState, EditHistory) of images already visited
+
+    def current(self):
+        return self.files[self.index] if self.files else None
+
+    def step(self, delta):
+        """Move delta images forward/back; return the new path, or None at either end"""
+        index = self.index + delta
+        if not 0 <= index < len(self.files):
+            return None
+        self.index = index
+        return self.files[index]
+
+    def neighbors(self):
+        """Paths worth prefetching: the next image first, then the previous one"""
+        return [self.files[i] for i in (self.index + 1, self.index - 1) if 0 <= i < len(self.files)]
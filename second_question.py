@@ -1,20 +1,57 @@
 # Import necessary modules
+import numpy as np
 import pygame
+import gc
 import sys
+import time
 import random
+import struct
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from game_spatial import SpatialGroup  # Grid-indexed sprite groups for collision queries
+from game_render import DirtyRectRenderer, StaticChunks, SurfaceCache, TextCache  # Drawing helpers
+from game_entities import EnemyStore, PlatformTable, ProjectileStore, resolve_projectile_hits  # NumPy entity arrays
+from game_input import NO_CONTROLS, Controls, InputRecording, ReplayMismatch  # Player input, recorded and replayed
+from game_profiler import ProfilerOverlay, profiler  # Per-phase frame timings (F3 overlay, F4 export)
+from game_rewind import RewindBuffer, load_state, save_state  # Compact state history and saved games
 
 # ----------------------------
 # Game Constants
 # ----------------------------
 WIDTH, HEIGHT = 900, 500          # Window size
 FPS = 60                          # Frames per second
+TICK_RATE = 60                    # Simulation steps per second, independent of the frame rate
+DT = 1.0 / TICK_RATE              # Length of one simulation step in seconds
+MAX_FRAME_TIME = 0.25             # Longest frame the simulation catches up on (avoids a death spiral)
 GRAVITY = 0.8                     # Force pulling the player downward
 PLAYER_SPEED = 5                  # Left/right speed of the player
 JUMP_POWER = 15                   # Strength of the jump
 PROJECTILE_SPEED = 10             # Speed of the bullets
 ENEMY_SPEED = 2                   # How fast enemies move
 LEVEL_LENGTH = 3000               # Width of the level (scrollable area)
+CHUNK_WIDTH = 900                 # Levels are generated and unloaded in pieces this wide
+LOAD_MARGIN = 1                   # Chunks kept loaded on each side of the ones in view
+MAX_SAVED_CHUNKS = 4096           # Unloaded chunks whose changes are remembered
+FIRST_PLATFORM_X = 300            # Where the first floating platform goes
+PLATFORM_SPACING = 250            # Distance between floating platforms
 CAMERA_LAG = 0.1                  # Smooth camera follow factor
+PROJECTILE_SIZE = (15, 5)         # Bullet width, height
+PROJECTILE_DAMAGE = 40            # Health a bullet takes from an enemy
+ENEMY_SIZE, BOSS_SIZE = (40, 60), (60, 90)
+ENEMY_HEALTH, BOSS_HEALTH = 40, 200
+SWARM_SIZE = 150                  # Enemies in the "swarm" scenario
+REWIND_SPEED = 2                  # States gone back per frame while Backspace is held
+RETRY_SECONDS = 5                 # How far "go back" on the game over screen rewinds
+QUICKSAVE_PATH = "quicksave.state"  # F5 saves the game here, F9 loads it
+
+# Game and player numbers in a snapshot: tick, level, game over, kills, lives lost, level start,
+# player x, y, previous x, y, vel_y, on ground, health, lives, score, invincible, direction,
+# camera x, previous x, then how many levels were cleared (their tick counts follow)
+CORE_STATE = struct.Struct("<qq?qqqqqqqd?qqqqqddq")
+
+# How levels are generated; pass different ones to GameSim to tune levels
+LevelParams = namedtuple("LevelParams", ["platform_spacing", "enemy_every", "item_every", "enemy_health", "enemy_speed"])
+DEFAULT_LEVEL = LevelParams(PLATFORM_SPACING, 3, 4, ENEMY_HEALTH, ENEMY_SPEED)
 
 # Colors (R, G, B)
 WHITE = (255, 255, 255)
@@ -24,13 +61,58 @@ GREEN = (50, 220, 50)
 BLUE = (50, 50, 220)
 YELLOW = (255, 255, 0)
 GRAY = (180, 180, 180)
+SKY = (120, 200, 255)
+DARK_RED = (120, 0, 0)
+COLOR_KEY = (255, 0, 255)  # Transparent color of pre-drawn health bars
 
-# Initialize Pygame
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Animal Hero Side-Scroller")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont("Arial", 24)  # Font for text
+FONT_SIZE = 24  # HUD and menu text
+
+# Filled surfaces shared by all sprites of the same size and color
+surfaces = SurfaceCache()
+hud_text = TextCache(WHITE)  # HUD strings, rendered again only when they change
+
+# ----------------------------
+# Window, Clock and Fonts
+# ----------------------------
+class GameApp:
+    """The game window, frame clock and fonts, each set up the first time it is used
+
+    Only the pygame subsystems that are used get started (display, font; not audio or
+    joysticks), so importing this module to run the simulation opens nothing. Fonts are pygame's
+    bundled one: it loads in well under a millisecond, where looking up a system font can take
+    hundreds.
+    """
+
+    def __init__(self, size=(WIDTH, HEIGHT), caption="Animal Hero Side-Scroller"):
+        self.size = size
+        self.caption = caption
+        self.clock = pygame.time.Clock()  # Needs no subsystem; tests may swap in their own
+        self._screen = None
+        self.fonts = {}  # size -> Font
+
+    @property
+    def screen(self):
+        """The window surface, opening the window on first use"""
+        if self._screen is None:
+            pygame.display.init()
+            self._screen = pygame.display.set_mode(self.size)
+            pygame.display.set_caption(self.caption)
+        return self._screen
+
+    def font(self, size=FONT_SIZE):
+        font = self.fonts.get(size)
+        if font is None:
+            pygame.font.init()  # Does nothing if already started
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def close(self):
+        self._screen = None
+        self.fonts.clear()
+        pygame.quit()
+
+
+app = GameApp()
 
 # ----------------------------
 # Player Class
@@ -38,9 +120,8 @@ font = pygame.font.SysFont("Arial", 24)  # Font for text
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
-        self.image = pygame.Surface((40, 60))  # Player size
-        self.image.fill(BLUE)  # Player color
-        self.rect = self.image.get_rect(topleft=(x, y))
+        self.rect = pygame.Rect(x, y, 40, 60)  # Player size
+        self.prev = self.rect.topleft  # Position before the last step, for interpolated drawing
         self.vel_y = 0
         self.on_ground = False
         self.health = 100
@@ -49,14 +130,17 @@ class Player(pygame.sprite.Sprite):
         self.invincible = 0  # Time left where player can't take damage
         self.direction = 1   # 1 = right, -1 = left
 
-    def update(self, platforms):
-        # Handle keyboard input
-        keys = pygame.key.get_pressed()
+    @property
+    def image(self):
+        return surfaces.get(self.rect.size, BLUE)  # Player color
+
+    def update(self, platforms, controls):
+        # Handle player input
         dx = 0
-        if keys[pygame.K_LEFT]:
+        if controls.left:
             dx = -PLAYER_SPEED
             self.direction = -1
-        if keys[pygame.K_RIGHT]:
+        if controls.right:
             dx = PLAYER_SPEED
             self.direction = 1
         self.rect.x += dx
@@ -65,9 +149,9 @@ class Player(pygame.sprite.Sprite):
         self.vel_y += GRAVITY
         self.rect.y += self.vel_y
 
-        # Collision with platforms
+        # Collision with platforms (only those in nearby grid cells are tested)
         self.on_ground = False
-        for plat in platforms:
+        for plat in platforms.hits(self.rect):
             if self.rect.colliderect(plat.rect):
                 if self.vel_y > 0:
                     self.rect.bottom = plat.rect.top
@@ -86,10 +170,9 @@ class Player(pygame.sprite.Sprite):
     def shoot(self, projectiles):
         # Shoot a bullet in the current direction
         if self.direction == 1:
-            proj = Projectile(self.rect.right, self.rect.centery, PROJECTILE_SPEED)
+            projectiles.spawn(self.rect.right, self.rect.centery, PROJECTILE_SPEED)
         else:
-            proj = Projectile(self.rect.left, self.rect.centery, -PROJECTILE_SPEED)
-        projectiles.add(proj)
+            projectiles.spawn(self.rect.left, self.rect.centery, -PROJECTILE_SPEED)
 
     def take_damage(self, amount):
         # Lose health/lives when hit by an enemy
@@ -100,72 +183,26 @@ class Player(pygame.sprite.Sprite):
                 self.lives -= 1
                 self.health = 100  # Reset health
 
-# ----------------------------
-# Projectile Class
-# ----------------------------
-class Projectile(pygame.sprite.Sprite):
-    def __init__(self, x, y, speed):
-        super().__init__()
-        self.image = pygame.Surface((15, 5))
-        self.image.fill(YELLOW)
-        self.rect = self.image.get_rect(center=(x, y))
-        self.speed = speed
-
-    def update(self):
-        # Move the bullet
-        self.rect.x += self.speed
-        # Remove if off-screen
-        if self.rect.left > LEVEL_LENGTH or self.rect.right < 0:
-            self.kill()
-
-# ----------------------------
-# Enemy Class
-# ----------------------------
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y, health=40, boss=False):
-        super().__init__()
-        self.boss = boss
-        w, h = (60, 90) if boss else (40, 60)
-        self.image = pygame.Surface((w, h))
-        self.image.fill(RED if not boss else (120, 0, 0))
-        self.rect = self.image.get_rect(topleft=(x, y))
-        self.health = health if not boss else 200
-        self.speed = ENEMY_SPEED if not boss else ENEMY_SPEED // 2
-        self.direction = 1  # Moving right initially
-
-    def update(self, platforms):
-        # Move enemy left or right
-        self.rect.x += self.speed * self.direction
-
-        # Reverse direction if at edge
-        on_platform = False
-        for plat in platforms:
-            if plat.rect.collidepoint(self.rect.midbottom):
-                on_platform = True
-        if not on_platform:
-            self.direction *= -1
-            self.rect.x += self.speed * self.direction * 2
-
-    def take_damage(self, amount):
-        self.health -= amount
-        if self.health <= 0:
-            self.kill()
-
 # ----------------------------
 # Collectible Class (health, life)
 # ----------------------------
 class Collectible(pygame.sprite.Sprite):
-    def __init__(self, x, y, kind):
+    def __init__(self, x, y, kind, key=None):
         super().__init__()
         self.kind = kind
-        self.image = pygame.Surface((30, 30))
+        self.key = key  # Identifies the item within its level, to remember that it was collected
         if kind == "health":
-            self.image.fill(GREEN)
+            self.color = GREEN
         elif kind == "life":
-            self.image.fill(WHITE)
+            self.color = WHITE
         else:
-            self.image.fill(GRAY)
-        self.rect = self.image.get_rect(center=(x, y))
+            self.color = GRAY
+        self.rect = pygame.Rect(0, 0, 30, 30)
+        self.rect.center = (x, y)
+
+    @property
+    def image(self):
+        return surfaces.get(self.rect.size, self.color)
 
 # ----------------------------
 # Platform Class
@@ -173,139 +210,343 @@ class Collectible(pygame.sprite.Sprite):
 class Platform(pygame.sprite.Sprite):
     def __init__(self, x, y, w, h):
         super().__init__()
-        self.image = pygame.Surface((w, h))
-        self.image.fill(GRAY)
-        self.rect = self.image.get_rect(topleft=(x, y))
+        self.rect = pygame.Rect(x, y, w, h)
+
+    @property
+    def image(self):
+        return surfaces.get(self.rect.size, GRAY)
 
 # ----------------------------
-# Generate Platforms, Enemies, and Collectibles
+# Streamed Level Generation
 # ----------------------------
-def make_level(level_num):
-    platforms = pygame.sprite.Group()
-    enemies = pygame.sprite.Group()
-    collectibles = pygame.sprite.Group()
-
-    # Add the ground
-    platforms.add(Platform(0, HEIGHT-40, LEVEL_LENGTH, 40))
-
-    # Create platforms + enemies + items
-    for i in range(10):
-        x = 300 + i * 250 + random.randint(-50, 50)
-        y = HEIGHT - 120 - random.randint(0, 120)
-        platforms.add(Platform(x, y, 120, 20))
-        if i % 3 == 0:
-            enemies.add(Enemy(x + 60, y - 60))
-        if i % 4 == 0:
-            collectibles.add(Collectible(x + 60, y - 40, "health"))
-        if i == 7 and level_num == 2:
-            collectibles.add(Collectible(x + 60, y - 40, "life"))
-
-    # Add a boss in level 3
-    if level_num == 3:
-        enemies.add(Enemy(LEVEL_LENGTH - 200, HEIGHT - 130, boss=True))
-
-    return platforms, enemies, collectibles
+class LevelStreamer:
+    """Generates a level chunk by chunk as the view nears it, and unloads chunks left far behind
+
+    A chunk is built from the level seed and its own index only, so it comes out the same every
+    time it is loaded. What the player changed in a chunk (enemies moved, hurt or killed, items
+    collected) is saved compactly when it unloads and put back when it loads again. With
+    length=None the level never ends; memory stays bounded by the loaded chunks plus at most
+    max_saved saved ones (older saves are dropped and those chunks come back fresh).
+    """
+
+    def __init__(self, level_num, seed, platforms, enemies, collectibles,
+                 length=LEVEL_LENGTH, params=DEFAULT_LEVEL, max_saved=MAX_SAVED_CHUNKS):
+        self.level_num = level_num
+        self.seed = seed
+        self.params = params
+        self.platforms = platforms  # SpatialGroup the loaded chunks' platforms are added to
+        self.enemies = enemies  # EnemyStore, cleared by the caller
+        self.collectibles = collectibles  # SpatialGroup for the loaded chunks' items
+        self.length = length
+        self.last_chunk = None if length is None else (length - 1) // CHUNK_WIDTH
+        self.max_saved = max_saved
+        self.loaded = {}  # chunk index -> (platforms, collectibles, keys collected before loading)
+        self.saved = OrderedDict()  # chunk index -> (enemy records, collected keys), oldest first
+        self.window = None  # (first, last) chunk indices kept loaded
+        self.on_change = None  # Called with (x0, x1) when platforms in that span appear or go away
+        self.saved_bytes = None  # saved_state(), until a chunk loads or unloads
+
+    @property
+    def left(self):
+        return min(self.loaded) * CHUNK_WIDTH if self.loaded else 0
+
+    @property
+    def right(self):
+        # Right end of the loaded chunks, or of the level if that comes first
+        right = (max(self.loaded) + 1) * CHUNK_WIDTH if self.loaded else 0
+        return right if self.length is None else min(right, self.length)
+
+    def update(self, x0, x1):
+        """Have the chunks around level span [x0, x1) loaded; returns True if any chunk came or went"""
+        first = max(0, int(x0) // CHUNK_WIDTH - LOAD_MARGIN)
+        last = int(x1 - 1) // CHUNK_WIDTH + LOAD_MARGIN
+        if self.last_chunk is not None:
+            last = min(last, self.last_chunk)
+        if (first, last) == self.window:
+            return False
+        self.window = first, last
+        # Unload only beyond one more chunk, so walking back and forth over an edge doesn't thrash
+        stale = [index for index in self.loaded if index < first - 1 or index > last + 1]
+        for index in stale:
+            self.unload(index)
+        fresh = [index for index in range(first, last + 1) if index not in self.loaded]
+        for index in fresh:
+            self.load(index)
+        return bool(stale or fresh)
+
+    def slots(self, index):
+        # Platform numbers i whose spot (before jitter) falls in this chunk
+        x0 = index * CHUNK_WIDTH
+        spacing = self.params.platform_spacing
+        first = max(0, -(-(x0 - FIRST_PLATFORM_X) // spacing))
+        last = (x0 + CHUNK_WIDTH - 1 - FIRST_PLATFORM_X) // spacing
+        if self.length is not None:
+            last = min(last, (self.length - FIRST_PLATFORM_X) // spacing - 1)
+        return range(first, last + 1)
+
+    def load(self, index, collected=None):
+        # collected is given when restoring a snapshot, which brings its own enemies back
+        x0 = index * CHUNK_WIDTH
+        width = CHUNK_WIDTH if self.length is None else min(CHUNK_WIDTH, self.length - x0)
+        platforms = [Platform(x0, HEIGHT - 40, width, 40)]  # This chunk's stretch of ground
+        items = []
+        walkers = []
+        params = self.params
+        for i in self.slots(index):
+            rng = random.Random((self.seed << 32) + i)  # Own stream per platform, any load order
+            x = FIRST_PLATFORM_X + i * params.platform_spacing + rng.randint(-50, 50)
+            y = HEIGHT - 120 - rng.randint(0, 120)
+            platforms.append(Platform(x, y, 120, 20))
+            if i % params.enemy_every == 0:
+                walkers.append((x + 60, y - 60))
+            if i % params.item_every == 0:
+                items.append(Collectible(x + 60, y - 40, "health", key=i))
+            if i == 7 and self.level_num == 2:
+                items.append(Collectible(x + 60, y - 40, "life", key=i))
+
+        saved = self.saved.pop(index, None) if collected is None else None
+        if collected is not None:
+            items = [c for c in items if c.key not in collected]
+        elif saved is None:
+            collected = frozenset()
+            for x, y in walkers:
+                self.enemies.spawn(x, y, ENEMY_SIZE, params.enemy_health, params.enemy_speed)
+            # Add a boss near the end of level 3
+            if self.level_num == 3 and self.length is not None and x0 <= self.length - 200 < x0 + width:
+                self.enemies.spawn(self.length - 200, HEIGHT - 130, BOSS_SIZE, BOSS_HEALTH, ENEMY_SPEED // 2,
+                                   boss=True)
+        else:
+            records, collected = saved
+            records["prev_x"] = records["x"]  # Back where they were left, not moving in from there
+            self.enemies.extend(records)
+            items = [c for c in items if c.key not in collected]
+
+        if saved is not None:
+            self.saved_bytes = None
+        self.platforms.add(platforms)
+        self.collectibles.add(items)
+        self.loaded[index] = platforms, items, collected
+        self.changed(platforms)
+
+    def unload(self, index):
+        platforms, items, collected = self.loaded.pop(index)
+        # Enemies belong to the chunk their middle is over (they can't walk off loaded ground)
+        enemies = self.enemies
+        middle = enemies.live("x") + enemies.live("w") // 2
+        records = enemies.take(middle // CHUNK_WIDTH == index)
+        collected = collected.union(c.key for c in items if not c.alive())
+        for sprite in platforms + items:
+            sprite.kill()
+        self.saved[index] = records, collected
+        while len(self.saved) > self.max_saved:
+            self.saved.popitem(last=False)
+        self.saved_bytes = None
+        self.changed(platforms)
+
+    def chunk_state(self):
+        """Seed, window and each loaded chunk's collected items, as bytes (for snapshots)"""
+        length = -1 if self.length is None else self.length
+        ints = [self.seed, *self.window, length, *self.params, len(self.loaded)]
+        for index, (_, items, collected) in self.loaded.items():
+            keys = collected.union(c.key for c in items if not c.alive())
+            ints += [index, len(keys), *sorted(keys)]
+        return np.array(ints, np.int64).tobytes()
+
+    def saved_state(self):
+        """The unloaded chunks' saved changes as bytes; built again only after a chunk loads or unloads"""
+        if self.saved_bytes is None:
+            ints, blobs = [], []
+            for index, (records, collected) in self.saved.items():
+                ints += [index, len(records), len(collected), *sorted(collected)]
+                blobs.append(records.tobytes())
+            self.saved_bytes = np.array([len(ints)] + ints, np.int64).tobytes() + b"".join(blobs)
+        return self.saved_bytes
+
+    def restore_saved(self, data):
+        # Inverse of saved_state()
+        n = int(np.frombuffer(data, np.int64, 1)[0])
+        ints = np.frombuffer(data, np.int64, n, 8).tolist()
+        dtype = self.enemies.record_dtype()
+        offset, i = 8 * (n + 1), 0
+        self.saved.clear()
+        while i < n:
+            index, count, n_keys = ints[i:i + 3]
+            keys = frozenset(ints[i + 3:i + 3 + n_keys])
+            records = np.frombuffer(data, dtype, count, offset).copy()
+            self.saved[index] = records, keys
+            offset += count * dtype.itemsize
+            i += 3 + n_keys
+        self.saved_bytes = data
+
+    def changed(self, platforms):
+        if self.on_change is not None:
+            self.on_change(min(p.rect.left for p in platforms), max(p.rect.right for p in platforms))
 
 # ----------------------------
 # Camera for Side-Scrolling
 # ----------------------------
 class Camera:
-    def __init__(self):
+    def __init__(self, level_length=LEVEL_LENGTH):
+        self.level_length = level_length  # None for a level without an end
         self.x = 0
+        self.prev_x = 0  # Position before the last step, for interpolated drawing
 
     def update(self, target_rect):
         # Smooth follow player
         target_x = target_rect.centerx - WIDTH // 3
         self.x += (target_x - self.x) * CAMERA_LAG
-        self.x = max(0, min(self.x, LEVEL_LENGTH - WIDTH))
+        self.x = max(0, self.x if self.level_length is None else min(self.x, self.level_length - WIDTH))
+
+    def offset(self, alpha=1.0):
+        # Whole-pixel scroll position, alpha of the way from the previous step to this one
+        return int(self.prev_x + (self.x - self.prev_x) * alpha)
+
+    def view_rect(self, alpha=1.0):
+        # Part of the level currently on screen
+        return pygame.Rect(self.offset(alpha), 0, WIDTH, HEIGHT)
 
     def apply(self, rect):
         # Move object based on camera x
-        return rect.move(-self.x, 0)
+        return rect.move(-self.offset(), 0)
 
 # ----------------------------
 # Health Bar Drawing Function
 # ----------------------------
-def draw_health_bar(surf, x, y, pct, max_width=100):
+def health_bar(pct, max_width=100):
+    # Pre-drawn bar surface for a health percentage; the unfilled inside is transparent
     pct = max(0, pct)
-    fill = int(max_width * pct / 100)
-    pygame.draw.rect(surf, RED, pygame.Rect(x, y, fill, 10))
-    pygame.draw.rect(surf, WHITE, pygame.Rect(x, y, max_width, 10), 2)
+    return health_bar_surface(int(max_width * pct / 100), max_width)
+
+
+@lru_cache(maxsize=None)
+def health_bar_surface(fill, max_width):
+    surface = pygame.Surface((max_width, 10))
+    surface.fill(COLOR_KEY)
+    surface.set_colorkey(COLOR_KEY)
+    pygame.draw.rect(surface, RED, pygame.Rect(0, 0, fill, 10))
+    pygame.draw.rect(surface, WHITE, pygame.Rect(0, 0, max_width, 10), 2)
+    return surface
 
 # ----------------------------
 # Game Over Screen
 # ----------------------------
-def game_over_screen(player):
+def game_over_screen(player, can_go_back=False):
+    screen, font = app.screen, app.font()
     screen.fill(BLACK)
     msg = "GAME OVER"
     score_msg = f"Score: {player.score}"
-    restart_msg = "Press R to Restart or Q to Quit"
+    restart_msg = f"Press R to Restart, B to go Back {RETRY_SECONDS} s or Q to Quit" if can_go_back else "Press R to Restart or Q to Quit"
     screen.blit(font.render(msg, True, WHITE), (WIDTH//2 - 80, HEIGHT//2 - 60))
     screen.blit(font.render(score_msg, True, WHITE), (WIDTH//2 - 80, HEIGHT//2 - 20))
     screen.blit(font.render(restart_msg, True, WHITE), (WIDTH//2 - 180, HEIGHT//2 + 20))
     pygame.display.flip()
 
-    # Wait for player input
-    waiting = True
-    while waiting:
+    # Wait for player input; returns "restart", "back" or "quit"
+    while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
+                return "quit"
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
-                    waiting = False
+                    return "restart"
+                if event.key == pygame.K_b and can_go_back:
+                    return "back"
                 if event.key == pygame.K_q:
-                    pygame.quit(); sys.exit()
+                    return "quit"
 
 # ----------------------------
-# Main Game Function
+# Game Simulation (no display needed)
 # ----------------------------
-def main():
-    level = 1
-    camera = Camera()
-    player = Player(100, HEIGHT - 100)
-    projectiles = pygame.sprite.Group()
-    platforms, enemies, collectibles = make_level(level)
-    running = True
-    game_over = False
-
-    while running:
-        clock.tick(FPS)
-
-        # --- Handle events ---
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if not game_over and event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    player.jump()
-                if event.key == pygame.K_f:
-                    player.shoot(projectiles)
-
-        # --- Update game logic ---
-        if not game_over:
-            player.update(platforms)
-            projectiles.update()
-            for enemy in enemies:
-                enemy.update(platforms)
-            camera.update(player.rect)
-
-            # Check for projectile-enemy collisions
-            for proj in projectiles:
-                hit = pygame.sprite.spritecollideany(proj, enemies)
-                if hit:
-                    hit.take_damage(40)
-                    proj.kill()
-                    if not hit.alive():
-                        player.score += 100 if not getattr(hit, 'boss', False) else 1000
+class GameSim:
+    """All game state and rules, advanced one fixed DT step at a time"""
+
+    def __init__(self, seed=None, endless=False, params=DEFAULT_LEVEL):
+        # Everything random comes from this seed, so a run can be played again from its inputs
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.rng_state = self.rng_bytes = None  # Last rng state seen by snapshot(), and its bytes
+        self.level_length = None if endless else LEVEL_LENGTH
+        self.params = params
+        # Entity slots are pooled: they are cleared and refilled by every new game and level
+        self.projectiles = ProjectileStore(PROJECTILE_SIZE)
+        self.enemies = EnemyStore()
+        self.reset()
+
+    def reset(self):
+        # Start a new game at level 1
+        self.level = 1
+        self.tick = 0
+        self.kills = 0
+        self.lives_lost = 0
+        self.level_ticks = []  # Steps it took to clear each level so far
+        self.level_start = 0  # Tick the current level started at
+        self.camera = Camera(self.level_length)
+        self.player = Player(100, HEIGHT - 100)
+        self.projectiles.clear()
+        self.load_level()
+        self.game_over = False
+
+    def load_level(self):
+        # Each level streams in from its own seed, drawn from the game's random numbers
+        self.platforms = SpatialGroup()
+        self.collectibles = SpatialGroup()
+        self.enemies.clear()
+        self.streamer = LevelStreamer(self.level, self.rng.getrandbits(32), self.platforms, self.enemies,
+                                      self.collectibles, self.level_length, self.params)
+        self.stream()
+
+    def stream(self):
+        # Keep the chunks around both the view and the player loaded (they are apart while the
+        # camera pans back after a level change)
+        player, x = self.player.rect, self.camera.x
+        if self.streamer.update(min(x, player.left), max(x + WIDTH, player.right)):
+            self.support = PlatformTable(self.platforms)  # Array form of the platforms for enemy edge checks
+
+    def step(self, controls=NO_CONTROLS):
+        """Advance the game by one tick"""
+        if self.game_over:
+            return
+        self.tick += 1
+        player = self.player
+
+        # Remember where everything was, so drawing can blend between steps
+        player.prev = player.rect.topleft
+        self.camera.prev_x = self.camera.x
+        self.enemies.remember()
+        self.projectiles.remember()
+
+        # Key presses and movement
+        with profiler.phase("player"):
+            if controls.jump:
+                player.jump()
+            if controls.shoot:
+                player.shoot(self.projectiles)
+            player.update(self.platforms, controls)
+        with profiler.phase("projectiles"):
+            self.projectiles.update(self.streamer.left, self.streamer.right)  # Gone once out of the loaded chunks
+        with profiler.phase("enemies"):
+            self.enemies.update(self.support)
+        with profiler.phase("stream"):
+            self.camera.update(player.rect)
+            self.stream()
+
+        with profiler.phase("collisions"):
+            # Check for projectile-enemy collisions (all bullets at once)
+            killed = resolve_projectile_hits(self.projectiles, self.enemies, PROJECTILE_DAMAGE)
+            for boss in self.enemies.boss[killed]:
+                player.score += 1000 if boss else 100
+            self.kills += len(killed)
+            self.enemies.remove_dead()
 
             # Player touching enemies
-            for enemy in enemies:
-                if player.rect.colliderect(enemy.rect):
-                    player.take_damage(20 if not getattr(enemy, 'boss', False) else 40)
+            lives = player.lives
+            for i in self.enemies.overlapping(player.rect):
+                player.take_damage(40 if self.enemies.boss[i] else 20)
+            self.lives_lost += lives - player.lives
 
             # Player collecting items
-            for c in pygame.sprite.spritecollide(player, collectibles, True):
+            for c in self.collectibles.hits(player.rect):
+                c.kill()
                 if c.kind == "health":
                     player.health = min(100, player.health + 30)
                     player.score += 20
@@ -313,55 +554,387 @@ def main():
                     player.lives += 1
                     player.score += 100
 
-            # Check for level completion
-            if player.rect.left > LEVEL_LENGTH - 60:
-                level += 1
-                if level > 3:
-                    game_over = True
+        # Check for level completion
+        if self.level_length is not None and player.rect.left > self.level_length - 60:
+            self.level_ticks.append(self.tick - self.level_start)
+            self.level_start = self.tick
+            self.level += 1
+            if self.level > 3:
+                self.game_over = True
+            else:
+                player.rect.topleft = (100, HEIGHT - 100)
+                player.prev = player.rect.topleft  # A jump back to the start, not a move
+                self.load_level()
+
+        # If player lost all lives
+        if player.lives <= 0:
+            self.game_over = True
+
+    def snapshot(self):
+        """The whole game state as a tuple of byte strings; restore() puts it back (see game_rewind)"""
+        player, camera = self.player, self.camera
+        core = CORE_STATE.pack(self.tick, self.level, self.game_over, self.kills, self.lives_lost, self.level_start,
+                               player.rect.x, player.rect.y, *player.prev, player.vel_y, player.on_ground,
+                               player.health, player.lives, player.score, player.invincible, player.direction,
+                               camera.x, camera.prev_x, len(self.level_ticks))
+        rng = self.rng.getstate()
+        if rng != self.rng_state:  # Changes only when a level is made, so converted once per change
+            self.rng_state, self.rng_bytes = rng, np.array(rng[1], np.uint32).tobytes()
+        return (core + np.array(self.level_ticks, np.int64).tobytes(),
+                self.enemies.records().tobytes(),
+                self.projectiles.records().tobytes(),
+                self.rng_bytes,
+                self.streamer.chunk_state(),
+                self.streamer.saved_state())
+
+    def restore(self, snapshot):
+        """Put back a state from snapshot(); fast when it is in the same loaded chunks as now"""
+        core, enemies, projectiles, rng, chunks, saved = snapshot
+        (self.tick, self.level, self.game_over, self.kills, self.lives_lost, self.level_start,
+         x, y, prev_x, prev_y, vel_y, on_ground, health, lives, score, invincible, direction,
+         camera_x, camera_prev_x, cleared) = CORE_STATE.unpack_from(core)
+        self.level_ticks = np.frombuffer(core, np.int64, cleared, CORE_STATE.size).tolist()
+        player = self.player
+        player.rect.topleft, player.prev, player.vel_y, player.on_ground = (x, y), (prev_x, prev_y), vel_y, on_ground
+        player.health, player.lives, player.score = health, lives, score
+        player.invincible, player.direction = invincible, direction
+        self.rng.setstate((3, tuple(np.frombuffer(rng, np.uint32).tolist()), None))
+
+        # Rebuild the loaded chunks only if they differ (other chunks, or items collected since)
+        if chunks != self.streamer.chunk_state() or saved != self.streamer.saved_state():
+            ints = np.frombuffer(chunks, np.int64).tolist()
+            seed, first, last, length = ints[:4]
+            self.level_length = None if length < 0 else length
+            self.params = LevelParams(*ints[4:4 + len(LevelParams._fields)])
+            self.platforms = SpatialGroup()
+            self.collectibles = SpatialGroup()
+            self.streamer = LevelStreamer(self.level, seed, self.platforms, self.enemies, self.collectibles,
+                                          self.level_length, self.params)
+            self.streamer.restore_saved(saved)
+            self.streamer.window = first, last
+            i = 4 + len(LevelParams._fields) + 1
+            for _ in range(ints[i - 1]):
+                index, n_keys = ints[i:i + 2]
+                self.streamer.load(index, frozenset(ints[i + 2:i + 2 + n_keys]))
+                i += 2 + n_keys
+            self.support = PlatformTable(self.platforms)
+        self.camera.level_length = self.level_length
+        self.camera.x, self.camera.prev_x = camera_x, camera_prev_x
+
+        self.enemies.clear()
+        self.enemies.extend(np.frombuffer(enemies, self.enemies.record_dtype()))
+        self.projectiles.clear()
+        self.projectiles.extend(np.frombuffer(projectiles, self.projectiles.record_dtype()))
+
+    def fingerprint(self):
+        """A few numbers summing up the game state, to check a replay ended where the recording did"""
+        player, enemies = self.player, self.enemies
+        return (self.tick, self.level, player.score, player.lives, player.health, player.rect.x, player.rect.y,
+                len(enemies), int(enemies.live("x").sum()), int(enemies.live("health").sum()),
+                len(self.projectiles), len(self.collectibles))
+
+# ----------------------------
+# Scenario Setups (for recordings and benchmarks)
+# ----------------------------
+def setup_boss(sim):
+    # Start on the boss level
+    sim.level = 3
+    sim.load_level()
+
+
+def setup_swarm(sim):
+    # A crowd of tough walkers on the ground ahead of the player
+    for _ in range(SWARM_SIZE):
+        sim.enemies.spawn(sim.rng.randint(400, 1700), HEIGHT - 100, ENEMY_SIZE, ENEMY_HEALTH * 10, ENEMY_SPEED)
+
+
+SETUPS = {"": lambda sim: None, "boss": setup_boss, "swarm": setup_swarm}
+
+
+def interpolate(sprite, alpha, offset_x):
+    # Screen position of a sprite alpha of the way from its previous to its current position
+    px, py = sprite.prev
+    x = px + (sprite.rect.x - px) * alpha
+    y = py + (sprite.rect.y - py) * alpha
+    return int(x) - offset_x, int(y)
+
+# ----------------------------
+# Drawing the Game
+# ----------------------------
+def scene(sim, alpha=1.0):
+    # Scroll offset and the on-screen sprites as (surface, (x, y)) blits, back to front
+    view = sim.camera.view_rect(alpha)
+    ox = view.x
+    items = [(c.image, (c.rect.x - ox, c.rect.y)) for c in sim.collectibles.hits(view)]
+
+    enemies = sim.enemies
+    for i in enemies.overlapping(view):
+        x = int(enemies.prev_x[i] + (enemies.x[i] - enemies.prev_x[i]) * alpha) - ox
+        y = int(enemies.y[i])
+        boss = enemies.boss[i]
+        items.append((surfaces.get((int(enemies.w[i]), int(enemies.h[i])), DARK_RED if boss else RED), (x, y)))
+        items.append((health_bar(enemies.health[i] / 2 if boss else enemies.health[i]), (x, y - 12)))
+    projectiles = sim.projectiles
+    if projectiles:
+        px, prev_x = projectiles.live("x"), projectiles.live("prev_x")
+        shown = np.flatnonzero((px + projectiles.w > ox) & (px < ox + WIDTH))
+        xs = (prev_x[shown] + (px[shown] - prev_x[shown]) * alpha).astype(int) - ox
+        bullet = surfaces.get(PROJECTILE_SIZE, YELLOW)
+        items.extend((bullet, pos) for pos in zip(xs.tolist(), projectiles.y[shown].tolist()))
+    player = sim.player
+    items.append((player.image, interpolate(player, alpha, ox)))
+
+    # Display UI (health, lives, score, level)
+    items.append((health_bar(player.health), (20, 20)))
+    font = app.font()
+    items.append((hud_text.get(font, f"Lives: {player.lives}"), (20, 40)))
+    items.append((hud_text.get(font, f"Score: {player.score}"), (20, 65)))
+    items.append((hud_text.get(font, f"Level: {sim.level}"), (WIDTH - 120, 20)))
+    return ox, items
+
+
+def draw_game(surf, sim, level_chunks, alpha=1.0):
+    # Background and platforms come from cached chunks; only on-screen sprites are drawn
+    ox, items = scene(sim, alpha)
+    level_chunks.draw(surf, ox)
+    surf.blits(items, doreturn=False)
+
+# ----------------------------
+# Main Game Function
+# ----------------------------
+def main(dirty_rects=False, endless=False, record_path=None, replay=None):
+    # record_path: save this game's input there on exit; replay: an InputRecording to show instead
+    sim = replay_sim(replay) if replay is not None else GameSim(endless=endless)
+    replayed = iter(replay) if replay is not None else None
+    recording = InputRecording(sim.seed, endless) if record_path else None
+    # Recent states for Backspace and retries; off while recording or replaying, as a jump back
+    # in time can't be expressed as input
+    rewind = RewindBuffer() if replay is None and recording is None else None
+    if rewind is not None:
+        rewind.push(sim.snapshot())
+    level_chunks = None
+    renderer = DirtyRectRenderer() if dirty_rects else None  # Optional: present only what changed
+    overlay = None  # Profiler panel, made the first time profiling is switched on
+    screen, clock = app.screen, app.clock  # Opens the window
+    accumulator = 0.0
+    jump = shoot = False  # Key presses not yet handed to a simulation step
+    running = True
+
+    while running:
+        # Real time since the last frame, capped so a stall doesn't trigger a burst of steps
+        accumulator += min(clock.tick(FPS) / 1000.0, MAX_FRAME_TIME)
+        profiler.begin_frame()  # Frame time is the work done, not the wait in clock.tick()
+
+        # --- Handle events ---
+        with profiler.phase("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE:
+                        jump = True
+                    if event.key == pygame.K_f:
+                        shoot = True
+                    if event.key == pygame.K_F3:
+                        profiler.enabled = not profiler.enabled  # The overlay shows while profiling
+                        if renderer is not None:
+                            renderer.invalidate()
+                    if event.key == pygame.K_F4:
+                        try:
+                            profiler.export_csv("game_profile.csv")
+                            profiler.export_trace("game_trace.json")
+                        except IOError as e:  # Read-only folder, full disk, ...
+                            print(f"Could not export the profile: {e}")
+                    if event.key == pygame.K_F5 and rewind is not None:
+                        try:
+                            save_state(QUICKSAVE_PATH, sim.snapshot())
+                        except IOError as e:  # Read-only folder, full disk, ...
+                            print(f"Could not save {QUICKSAVE_PATH}: {e}")
+                    if event.key == pygame.K_F9 and rewind is not None:
+                        try:
+                            sim.restore(load_state(QUICKSAVE_PATH))
+                        except IOError as e:  # No quick save yet, or an unreadable one
+                            print(f"Could not load {QUICKSAVE_PATH}: {e}")
+                        else:
+                            rewind.push(sim.snapshot())
+                            accumulator = 0.0
+
+        # --- Update game logic in fixed steps ---
+        with profiler.phase("update"):
+            keys = pygame.key.get_pressed()
+            if rewind is not None and keys[pygame.K_BACKSPACE]:
+                # Play time backwards instead of stepping: the game is paused where Backspace is let go
+                if len(rewind) > 1:
+                    sim.restore(rewind.rewind(REWIND_SPEED))
+                accumulator = 0.0
+                jump = shoot = False
+            while accumulator >= DT and (replayed is not None or not sim.game_over):
+                if replayed is not None:
+                    controls = next(replayed, None)
+                    if controls is None:  # End of the recording, which must have ended the same way
+                        check_replay(sim, replay)
+                        running = False
+                        break
+                    replay_step(sim, controls)
                 else:
-                    player.rect.topleft = (100, HEIGHT - 100)
-                    platforms, enemies, collectibles = make_level(level)
-
-            # If player lost all lives
-            if player.lives <= 0:
-                game_over = True
-
-        # --- Drawing on screen ---
-        screen.fill((120, 200, 255))  # Background color
-
-        for plat in platforms:
-            screen.blit(plat.image, camera.apply(plat.rect))
-        for c in collectibles:
-            screen.blit(c.image, camera.apply(c.rect))
-        for enemy in enemies:
-            screen.blit(enemy.image, camera.apply(enemy.rect))
-            draw_health_bar(screen, camera.apply(enemy.rect).x, camera.apply(enemy.rect).y - 12, enemy.health if not getattr(enemy, 'boss', False) else enemy.health / 2)
-        for proj in projectiles:
-            screen.blit(proj.image, camera.apply(proj.rect))
-        screen.blit(player.image, camera.apply(player.rect))
-
-        # Display UI (health, lives, score, level)
-        draw_health_bar(screen, 20, 20, player.health)
-        screen.blit(font.render(f"Lives: {player.lives}", True, WHITE), (20, 40))
-        screen.blit(font.render(f"Score: {player.score}", True, WHITE), (20, 65))
-        screen.blit(font.render(f"Level: {level}", True, WHITE), (WIDTH - 120, 20))
-
-        # Game over screen
-        if game_over:
-            game_over_screen(player)
-            # Reset game state
-            level = 1
-            camera = Camera()
-            player = Player(100, HEIGHT - 100)
-            projectiles = pygame.sprite.Group()
-            platforms, enemies, collectibles = make_level(level)
-            game_over = False
-
-        pygame.display.flip()  # Show everything
+                    controls = Controls(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], jump, shoot)
+                    sim.step(controls)
+                    if recording is not None:
+                        recording.append(controls)
+                    if rewind is not None:
+                        with profiler.phase("snapshot"):
+                            rewind.push(sim.snapshot())
+                jump = shoot = False
+                accumulator -= DT
+
+        # --- Drawing on screen, blended between the last two steps ---
+        if level_chunks is None or level_chunks.sprites is not sim.platforms:
+            level_chunks = StaticChunks(sim.platforms, WIDTH, HEIGHT, SKY)  # New level
+            sim.streamer.on_change = level_chunks.invalidate  # Re-render where chunks stream in or out
+            # Collect the old level now, then keep the long-lived objects out of later
+            # collections so they can't cause a frame-time spike mid-level
+            gc.unfreeze()
+            gc.collect()
+            gc.freeze()
+        with profiler.phase("scene"):
+            ox, items = scene(sim, accumulator / DT)
+            if profiler.enabled:
+                profiler.count("enemies", len(sim.enemies))
+                profiler.count("projectiles", len(sim.projectiles))
+                profiler.count("collectibles", len(sim.collectibles))
+                profiler.count("platforms", len(sim.platforms))
+                profiler.count("sprites drawn", len(items))
+                if overlay is None:
+                    overlay = ProfilerOverlay(profiler, app.font(20), (WIDTH - 330, 50))
+                items += overlay.items()
+        if renderer is not None:
+            with profiler.phase("present"):
+                renderer.present(screen, level_chunks, ox, items)
+        else:
+            with profiler.phase("draw"):
+                level_chunks.draw(screen, ox)
+                screen.blits(items, doreturn=False)
+            with profiler.phase("flip"):
+                pygame.display.flip()  # Show everything
+        profiler.end_frame()
+
+        # Game over screen (a replay restarts on its next step instead)
+        if sim.game_over and replayed is None:
+            choice = game_over_screen(sim.player, rewind is not None and len(rewind) > 1)
+            if choice == "quit":
+                break
+            if choice == "back":
+                sim.restore(rewind.rewind(RETRY_SECONDS * TICK_RATE))  # Retry from a few seconds earlier
+            else:
+                sim.reset()  # Reset game state
+                if rewind is not None:
+                    rewind.clear()
+                    rewind.push(sim.snapshot())
+            accumulator = 0.0
+            jump = shoot = False
+            if renderer is not None:
+                renderer.invalidate()  # The game over text covered the whole screen
+
+    if recording is not None:
+        recording.fingerprint = sim.fingerprint()
+        recording.save(record_path)
+    return sim
+
+# ----------------------------
+# Replaying Recorded Input
+# ----------------------------
+def replay_sim(recording):
+    # A game set up the way the recorded one started
+    sim = GameSim(recording.seed, recording.endless)
+    SETUPS[recording.setup](sim)
+    return sim
+
+
+def replay_step(sim, controls):
+    # One recorded step; like main(), a finished game restarts before the next step
+    if sim.game_over:
+        sim.reset()
+    sim.step(controls)
+
+
+def check_replay(sim, recording):
+    if recording.fingerprint is not None and sim.fingerprint() != tuple(recording.fingerprint):
+        raise ReplayMismatch(f"Replay ended at {sim.fingerprint()}, recording at {tuple(recording.fingerprint)}")
+
+
+def play_back(recording, frame=None):
+    """Play a recorded game again step for step; frame(sim) is called after each step (e.g. to draw it)
+
+    Needs no window. Returns the game at the end; raises ReplayMismatch if it differs from the
+    recorded one.
+    """
+    sim = replay_sim(recording)
+    for controls in recording:
+        replay_step(sim, controls)
+        if frame is not None:
+            frame(sim)
+    check_replay(sim, recording)
+    return sim
+
+
+def record(seconds, policy, seed=None, endless=False, setup=""):
+    """Run a scripted game headlessly and return its InputRecording"""
+    sim = GameSim(seed, endless)
+    SETUPS[setup](sim)
+    recording = InputRecording(sim.seed, endless, setup)
+    for _ in range(int(seconds * TICK_RATE)):
+        controls = policy(sim)
+        replay_step(sim, controls)
+        recording.append(controls)
+    recording.fingerprint = sim.fingerprint()
+    return recording
+
+# ----------------------------
+# Headless Simulation
+# ----------------------------
+def autopilot(sim):
+    # Simple scripted player: run right, hop regularly and keep firing
+    return Controls(False, True, sim.tick % 45 == 0, sim.tick % 10 == 0)
+
+
+def run_headless(seconds, policy=autopilot, seed=None, endless=False):
+    """Step the game as fast as the CPU allows, with no window; returns run statistics"""
+    sim = GameSim(seed, endless)
+    ticks = int(seconds * TICK_RATE)
+    games = []
+    start = time.perf_counter()
+    for _ in range(ticks):
+        sim.step(policy(sim))
+        if sim.game_over:
+            games.append((sim.player.score, sim.level))
+            sim.reset()
+    wall = time.perf_counter() - start
+    return {
+        "ticks": ticks,
+        "wall_seconds": wall,
+        "sim_seconds_per_second": seconds / wall if wall > 0 else float("inf"),
+        "games_finished": len(games),
+        "final_scores": [score for score, _ in games],
+    }
 
 # ----------------------------
 # Start the game
 # ----------------------------
 if __name__ == "__main__":
-    main()
-    pygame.quit()
+    if len(sys.argv) > 2 and sys.argv[1] == "--headless":
+        # python second_question.py --headless SECONDS [--endless]
+        stats = run_headless(float(sys.argv[2]), endless="--endless" in sys.argv)
+        print(f"{stats['ticks']} ticks in {stats['wall_seconds']:.2f} s "
+              f"({stats['sim_seconds_per_second']:.0f} simulated seconds per second), "
+              f"{stats['games_finished']} games finished, scores {stats['final_scores']}")
+    elif len(sys.argv) > 2 and sys.argv[1] == "--replay":
+        # python second_question.py --replay FILE (also works with SDL_VIDEODRIVER=dummy)
+        recording = InputRecording.load(sys.argv[2])
+        main(dirty_rects="--dirty-rects" in sys.argv, replay=recording)  # Raises ReplayMismatch if it went elsewhere
+        app.close()
+    else:
+        # --dirty-rects is faster on software-rendered displays; --endless streams one level forever;
+        # --record FILE saves the game's input so it can be replayed
+        record_path = sys.argv[sys.argv.index("--record") + 1] if "--record" in sys.argv else None
+        main(dirty_rects="--dirty-rects" in sys.argv, endless="--endless" in sys.argv, record_path=record_path)
+        app.close()
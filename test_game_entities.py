@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pygame
+import pytest
+
+import game_entities
+from game_entities import EnemyStore, PlatformTable, ProjectileStore, resolve_hits_each, resolve_projectile_hits
+
+
+class Platform(pygame.sprite.Sprite):
+    def __init__(self, x, y, w, h):
+        super().__init__()
+        self.rect = pygame.Rect(x, y, w, h)
+
+
+def crowd(rng, spread):
+    # Bullets and enemies packed into a spread x spread square, so bullets compete for enemies
+    projectiles, enemies = ProjectileStore((15, 5)), EnemyStore()
+    for _ in range(rng.randint(1, 30)):
+        projectiles.spawn(rng.randint(0, spread), rng.randint(0, spread), 10)
+    for _ in range(rng.randint(1, 20)):
+        boss = rng.random() < 0.2
+        enemies.spawn(rng.randint(0, spread), rng.randint(0, spread), (60, 90) if boss else (40, 60),
+                      400 if boss else 40, 2, boss)
+    return projectiles, enemies
+
+
+def resolve_both(projectiles, enemies, monkeypatch):
+    # (killed, bullets left, health) from the array path and from checking bullets one by one
+    results = []
+    for vectorized in (True, False):
+        p, e = ProjectileStore((projectiles.w, projectiles.h)), EnemyStore()
+        p.extend(projectiles.records())
+        e.extend(enemies.records())
+        if vectorized:
+            monkeypatch.setattr(game_entities, "SCALAR_PAIRS", 0)
+            killed = resolve_projectile_hits(p, e, 40)
+        else:
+            killed = resolve_hits_each(p, e, 40)
+        results.append((killed.tolist(), p.records().tolist(), e.live("health").tolist()))
+    return results
+
+
+def test_bullet_passed_over_keeps_its_turn(monkeypatch):
+    projectiles, enemies = ProjectileStore((15, 5)), EnemyStore()
+    for cx, cy in [(59, 31), (40, 31), (57, 13)]:
+        projectiles.spawn(cx, cy, 10)
+    for x, y in [(16, 20), (35, 1), (7, 16)]:
+        enemies.spawn(x, y, (40, 60), 40, 2)
+    vectorized, sequential = resolve_both(projectiles, enemies, monkeypatch)
+    assert vectorized == sequential
+    assert sequential[0] == [0, 1] and len(sequential[1]) == 1
+
+
+@pytest.mark.parametrize("spread", [60, 150, 600])
+def test_vectorized_hits_match_one_by_one(spread, monkeypatch):
+    rng = random.Random(spread)
+    for _ in range(400):
+        vectorized, sequential = resolve_both(*crowd(rng, spread), monkeypatch)
+        assert vectorized == sequential
+
+
+def test_small_enemy_paths_match_arrays(monkeypatch):
+    rng = random.Random(1)
+    for _ in range(200):
+        platforms = [Platform(rng.randint(-200, 1500), rng.randint(100, 480), rng.randint(20, 400),
+                              rng.randint(5, 40)) for _ in range(rng.randint(0, 12))]
+        table = PlatformTable(platforms)
+        xs = np.array([rng.randint(-300, 2000) for _ in range(50)])
+        ys = np.array([rng.randint(0, 520) for _ in range(50)])
+        assert table.contains(xs.copy(), ys.copy()).tolist() == [table.contains_point(x, y)
+                                                                 for x, y in zip(xs.tolist(), ys.tolist())]
+
+        _, enemies = crowd(rng, 1500)
+        rect = pygame.Rect(rng.randint(0, 1500), rng.randint(0, 1500), 200, 200)
+        each = EnemyStore()
+        each.extend(enemies.records())
+        each.update(table)
+        hits = list(each.overlapping(rect))
+        monkeypatch.setattr(game_entities, "SCALAR_LIMIT", 0)
+        enemies.update(table)
+        assert np.array_equal(each.records(), enemies.records())
+        assert hits == enemies.overlapping(rect).tolist()
+        monkeypatch.undo()
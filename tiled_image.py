@@ -0,0 +1,193 @@
+# Importing necessary libraries
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+
+import cv2  # OpenCV for image processing
+import numpy as np
+from PIL import Image  # Only used to read image headers without decoding
+
+Image.MAX_IMAGE_PIXELS = None  # Huge scans are expected here, not decompression bombs
+
+try:
+    import tifffile  # Optional: lets uncompressed TIFFs be memory-mapped directly
+except ImportError:
+    tifffile = None
+
+# ----------------------------
+# Settings
+# ----------------------------
+TILE = 512  # Rows/columns handled at once when scanning a large image
+LARGE_IMAGE_BYTES = 256 * 1024 * 1024  # Decoded size above which compressed files are spilled to disk
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "image_editor_tiles")
+CACHE_MAX_BYTES = 8 * 1024 * 1024 * 1024  # Disk budget for spilled decodes
+RAW_NAME = re.compile(r"_(\d+)x(\d+)\.raw$", re.IGNORECASE)  # e.g. scan_40000x30000.raw (RGB, 8-bit)
+
+
+# ----------------------------
+# Tiled Image Backend
+# ----------------------------
+class TiledImage:
+    """Read-only RGB image backed by a memory map; pixels are only read where they are sliced"""
+
+    def __init__(self, data, mapping=None, path=None):
+        self.data = data  # Array view of the map, shape (H, W, 3) or (H, W), uint8
+        self.mapping = mapping  # The underlying mmap, used to drop pages we no longer need
+        self.path = path
+        h, w = data.shape[:2]
+        self.shape = (h, w, 3)
+        self.dtype = data.dtype
+        self.overviews = {}  # max_side -> low resolution array of the whole image
+
+    @property
+    def nbytes(self):
+        return self.shape[0] * self.shape[1] * 3
+
+    def __getitem__(self, key):
+        """Slice like a numpy array; the result is a lazy view into the map"""
+        region = self.data[key]
+        if region.ndim == 2:
+            return cv2.cvtColor(np.ascontiguousarray(region), cv2.COLOR_GRAY2RGB)
+        return region
+
+    def release(self):
+        """Unmap pages read so far; they are re-read from the file if touched again"""
+        if self.mapping is not None and hasattr(mmap, "MADV_DONTNEED"):
+            self.mapping.madvise(mmap.MADV_DONTNEED)
+
+    def read_region(self, box):
+        """Copy the (x0, y0, x1, y1) region into memory, touching only the tiles it covers"""
+        x0, y0, x1, y1 = box
+        out = np.empty((y1 - y0, x1 - x0, 3), np.uint8)
+        for ty in range(y0, y1, TILE):
+            band = self[ty:min(ty + TILE, y1), x0:x1]
+            out[ty - y0:ty - y0 + band.shape[0]] = band
+            self.release()
+        return out
+
+    def overview(self, max_side, box=None):
+        """Return a copy at most max_side pixels wide/tall, built one band of tiles at a time
+
+        box (x0, y0, x1, y1) limits it to that region, e.g. a crop; only the whole image's
+        overviews are kept for reuse.
+        """
+        key = max_side if box is None else None
+        if key in self.overviews:
+            return self.overviews[key]
+        x0, y0, x1, y1 = box or (0, 0, self.shape[1], self.shape[0])
+        h, w = y1 - y0, x1 - x0
+        if max(h, w) <= max_side:
+            return self.read_region((x0, y0, x1, y1))  # Small enough to keep at full resolution
+        step = max(1, int(max(h, w) / (max_side * 2)))  # Keep ~2x the target for INTER_AREA to average
+        out_w, out_h = max(1, w * max_side // max(h, w)), max(1, h * max_side // max(h, w))
+        rows = []
+        band_rows = TILE - TILE % step or step
+        for ty in range(y0, y1, band_rows):
+            rows.append(np.array(self[ty:min(ty + band_rows, y1):step, x0:x1:step]))
+            self.release()
+        sampled = np.concatenate(rows, axis=0)
+        small = cv2.resize(np.ascontiguousarray(sampled), (out_w, out_h), interpolation=cv2.INTER_AREA)
+        if key is not None:
+            self.overviews[key] = small
+        return small
+
+
+# ----------------------------
+# Opening Files
+# ----------------------------
+def open_image(path, large_bytes=LARGE_IMAGE_BYTES):
+    """Open path as a TiledImage, or return None if it is small enough to decode normally"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return map_npy(path)
+    if ext == ".raw":
+        match = RAW_NAME.search(path)
+        if not match:
+            raise IOError(f"Raw files must be named like name_<W>x<H>.raw: {path}")
+        w, h = int(match.group(1)), int(match.group(2))
+        return map_file(path, (h, w, 3), 0)
+    if ext in (".tif", ".tiff") and tifffile is not None:
+        with tifffile.TiffFile(path) as tif:
+            page = tif.pages[0]
+            contiguous = page.is_contiguous if page.dtype == np.uint8 else None
+            shape = page.shape
+            # Planar (3, H, W) pages and alpha channels can't be viewed as (H, W, 3) pixels
+            interleaved = page.samplesperpixel == 1 or page.planarconfig == tifffile.PLANARCONFIG.CONTIG
+        if contiguous and interleaved and is_pixel_shape(shape):
+            return map_file(path, shape, contiguous[0])
+        # Compressed or tiled TIFF, fall through to decoding
+    try:
+        with Image.open(path) as im:
+            w, h = im.size
+    except Exception:
+        return None  # Let the normal decoder report the error
+    if w * h * 3 < large_bytes:
+        return None
+    return decode_to_cache(path)
+
+
+def is_pixel_shape(shape):
+    """True for the (H, W) grey and (H, W, 3) colour layouts a TiledImage can serve"""
+    return len(shape) == 2 or (len(shape) == 3 and shape[2] == 3)
+
+
+def map_file(path, shape, offset):
+    """Memory-map uint8 pixel data stored at offset in a file"""
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    data = np.ndarray(shape, np.uint8, buffer=mapping, offset=offset)
+    return TiledImage(data, mapping, path)
+
+
+def map_npy(path):
+    """Memory-map an .npy file holding a (H, W, 3) or (H, W) uint8 array"""
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if fortran_order or dtype != np.uint8 or not is_pixel_shape(shape):
+        raise IOError(f"Expected a C-ordered (H, W) or (H, W, 3) uint8 image array, got {dtype} {shape}: {path}")
+    return map_file(path, shape, offset)
+
+
+def decode_to_cache(path):
+    """Decode a compressed file once into an .npy cache file and memory-map it"""
+    stat = os.stat(path)
+    key = hashlib.sha1(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, key + ".npy")
+    if not os.path.exists(cache_path):
+        img = cv2.imread(path)
+        if img is None:
+            raise IOError(f"Could not read image: {path}")
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        prune_cache(img.nbytes)
+        tmp_path = cache_path + ".tmp"
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=img.shape)
+        for ty in range(0, img.shape[0], TILE):
+            out[ty:ty + TILE] = cv2.cvtColor(img[ty:ty + TILE], cv2.COLOR_BGR2RGB)
+        out.flush()
+        del out, img
+        os.replace(tmp_path, cache_path)
+    else:
+        os.utime(cache_path)  # Mark as recently used
+    return map_npy(cache_path)
+
+
+def prune_cache(incoming_bytes, max_bytes=CACHE_MAX_BYTES):
+    """Delete the least recently used cache files until incoming_bytes fits in the budget"""
+    files = []
+    for name in os.listdir(CACHE_DIR):
+        full = os.path.join(CACHE_DIR, name)
+        st = os.stat(full)
+        files.append((st.st_mtime, st.st_size, full))
+    total = sum(size for _, size, _ in files) + incoming_bytes
+    for _, size, full in sorted(files):
+        if total <= max_bytes:
+            break
+        os.remove(full)
+        total -= size